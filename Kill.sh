@@ -10,9 +10,23 @@ if [ -z "$pids" ]; then
 fi
 
 echo "[INFO] 找到进程 PID：$pids"
-echo "[INFO] 正在杀死进程..."
+echo "[INFO] 正在停止进程 (SIGTERM，等待历史数据落盘)..."
 
-kill -9 $pids
+kill $pids
 
-echo "[OK] 进程已终止"
+# 调度器先完成当前一轮 (单个请求截止 30 秒)，再用不超过 9 秒落盘并关闭线程；
+# 最多等待 45 秒，仍未退出再强制结束
+i=0
+while [ $i -lt 45 ]; do
+    sleep 1
+    pids=$(pgrep -f "$PROCESS")
+    [ -z "$pids" ] && break
+    i=$((i + 1))
+done
+
+if [ -n "$pids" ]; then
+    echo "[WARN] 进程未在 45 秒内退出，强制终止..."
+    kill -9 $pids
+fi
 
+echo "[OK] 进程已终止"
@@ -0,0 +1,158 @@
+"""
+OmniMonitor 流式异常检测
+- 每个指标 O(1) 状态: EWMA 均值 / 方差 + EWMA 变化率 (每分钟)
+- 偏离检测: 新样本相对 EWMA 均值的 z 分数超过阈值
+- 变化率检测: 例如磁盘每分钟增长 1%、温度快速爬升
+- 磁盘剩余时间: 按当前增长率推算占满所需时间
+随采样增量更新，不回扫历史
+"""
+
+import math
+import time
+import fnmatch
+import threading
+
+
+class _MetricState:
+    __slots__ = ('n', 'mean', 'var', 'rate', 'last_ts', 'last_val', 'gap')
+
+    def __init__(self):
+        self.gap = 0.0          # 最近两次样本的间隔 (即该指标的采样周期)
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.rate = 0.0
+        self.last_ts = None
+        self.last_val = None
+
+
+class AnomalyDetector:
+    """
+    指标异常检测器 (由采集线程调用 update，其他线程读取 active_events)
+    配置见 monitor.anomaly
+    """
+
+    def __init__(self, config=None):
+        self._lock = threading.Lock()
+        self.states = {}
+        self.active = {}        # (key, kind) -> 事件
+        self._match_cache = {}
+        self.configure(config)
+
+    def configure(self, config):
+        cfg = config or {}
+        with self._lock:
+            self.enabled = cfg.get('enable', True)
+            self.alpha = cfg.get('alpha', 0.05)              # 均值 / 方差平滑系数
+            self.rate_alpha = cfg.get('rate_alpha', 0.2)     # 变化率平滑系数
+            self.z_threshold = cfg.get('z_threshold', 4.0)
+            self.min_samples = cfg.get('min_samples', 30)
+            self.min_delta = cfg.get('min_delta', 1.0)       # 偏离绝对量下限，避免方差接近 0 时误报
+            # cpu_usage 抖动大，默认不做偏离检测 (需要时在 metrics 中显式加入)
+            self.metrics = cfg.get('metrics', ['cpu_temp', 'mem_now', 'disk_*_usage', 'temp_*'])
+            self.rate_limits = cfg.get('rate_limits', {'disk_*_usage': 1.0, 'temp_*': 2.0, 'cpu_temp': 2.0})
+            self.ttf_metrics = cfg.get('ttf_metrics', ['disk_*_usage'])
+            self.ttf_hours = cfg.get('ttf_hours_threshold', 24)
+            self.hold = cfg.get('hold_seconds', 180)         # 事件恢复后仍保留的时长，保证调度器轮询能看到
+            self._match_cache.clear()
+
+    def _match(self, key):
+        """返回 (是否检测, 变化率上限, 是否推算占满时间)，结果按 key 缓存"""
+        hit = self._match_cache.get(key)
+        if hit is None:
+            watched = any(fnmatch.fnmatchcase(key, p) for p in self.metrics)
+            limit = next((v for p, v in self.rate_limits.items() if fnmatch.fnmatchcase(key, p)), None)
+            ttf = any(fnmatch.fnmatchcase(key, p) for p in self.ttf_metrics)
+            hit = self._match_cache[key] = (watched, limit, ttf)
+        return hit
+
+    def update(self, key, ts, value):
+        """喂入一个样本；返回本次新触发的事件列表"""
+        if not self.enabled:
+            return []
+        with self._lock:
+            watched, rate_limit, ttf = self._match(key)
+            if not watched:
+                return []
+            st = self.states.get(key)
+            if st is None:
+                st = self.states[key] = _MetricState()
+
+            events = []
+            # 1. 偏离: 先用旧的均值 / 方差评估，再更新
+            if st.n >= self.min_samples and st.var > 0:
+                dev = value - st.mean
+                z = dev / math.sqrt(st.var)
+                if abs(z) >= self.z_threshold and abs(dev) >= self.min_delta:
+                    events.append(self._event(key, 'deviation', value, z=round(z, 1), mean=round(st.mean, 2)))
+
+            # 2. 变化率 (单位/分钟)
+            if st.last_ts is not None and ts > st.last_ts:
+                st.gap = ts - st.last_ts
+                inst = (value - st.last_val) / st.gap * 60
+                st.rate = inst if st.n == 1 else st.rate + self.rate_alpha * (inst - st.rate)
+            if st.n >= self.min_samples and rate_limit is not None and st.rate >= rate_limit:
+                events.append(self._event(key, 'rate', value, rate=round(st.rate, 2)))
+
+            # 3. 占满剩余时间 (仅百分比类指标)
+            if ttf and st.n >= self.min_samples and st.rate > 0:
+                hours = (100 - value) / st.rate / 60
+                if hours <= self.ttf_hours:
+                    events.append(self._event(key, 'ttf', value, hours=round(hours, 1), rate=round(st.rate, 3)))
+
+            # EWMA 均值 / 方差增量更新
+            if st.n == 0:
+                st.mean = value
+            else:
+                diff = value - st.mean
+                incr = self.alpha * diff
+                st.mean += incr
+                st.var = (1 - self.alpha) * (st.var + diff * incr)
+            st.n += 1
+            st.last_ts, st.last_val = ts, value
+
+            # 维护活跃事件：未再触发且超过保留时长的视为已恢复
+            fired = {e['kind'] for e in events}
+            for kind in ('deviation', 'rate', 'ttf'):
+                ev = self.active.get((key, kind))
+                if ev and kind not in fired and ts - ev['ts'] > self.hold:
+                    del self.active[(key, kind)]
+            new = [e for e in events if (key, e['kind']) not in self.active]
+            for e in events:
+                e['ts'] = ts
+                self.active[(key, e['kind'])] = e
+            return new
+
+    @staticmethod
+    def _event(key, kind, value, **extra):
+        return {'key': key, 'kind': kind, 'value': round(value, 2), **extra}
+
+    def forget(self, key):
+        """删除指标的状态与进行中的事件"""
+        with self._lock:
+            self.states.pop(key, None)
+            self._match_cache.pop(key, None)
+            for k in [k for k in self.active if k[0] == key]:
+                del self.active[k]
+
+    def active_events(self, now=None):
+        """
+        进行中的事件
+        指标停止上报 (磁盘被卸载、传感器消失) 时 update 不再被调用，
+        超过 hold + 该指标采样周期仍未刷新的事件在这里视为已恢复
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            for k, ev in list(self.active.items()):
+                st = self.states.get(k[0])
+                if now - ev['ts'] > self.hold + (st.gap if st else 0.0):
+                    del self.active[k]
+            return list(self.active.values())
+
+    def describe(self, key):
+        """单个指标的当前状态 (均值 / 标准差 / 变化率)"""
+        with self._lock:
+            st = self.states.get(key)
+            if st is None:
+                return None
+            return {'n': st.n, 'mean': round(st.mean, 2), 'std': round(math.sqrt(st.var), 2), 'rate_per_min': round(st.rate, 3)}
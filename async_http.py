@@ -0,0 +1,237 @@
+"""
+OmniMonitor 异步 HTTP 引擎
+- AsyncHttpClient: 基于 asyncio 非阻塞套接字的 HTTP/1.1 客户端，
+  按主机复用长连接，每个主机有并发上限，每次请求有截止时间
+- AsyncRunner: 在独立线程中常驻一个事件循环，供同步代码提交协程并等待结果
+单线程即可并发执行几十个请求，不随并发数增加线程 (适合小内存设备)
+"""
+
+import ssl
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit, urljoin
+from http_pool import HttpPool, HttpResponse, HttpStatusError, safe_url
+
+
+class _AsyncConn:
+    __slots__ = ('reader', 'writer', 'idle_since')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = time.monotonic()
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class AsyncHttpClient:
+    """
+    异步 HTTP 客户端 (只能在所属事件循环中使用)
+    配置: per_host 每主机并发上限，max_idle 每主机保留的空闲连接数，idle_timeout 空闲连接存活秒数
+    """
+
+    def __init__(self, config=None):
+        cfg = config or {}
+        self.per_host = max(1, int(cfg.get('per_host', 4)))
+        self.max_idle = max(1, int(cfg.get('max_idle', 2)))
+        self.idle_timeout = cfg.get('idle_timeout', 60)
+        self.timeout = cfg.get('timeout', 10)
+        self.max_redirects = cfg.get('max_redirects', 3)
+        self._ssl_ctx = ssl.create_default_context()
+        self._idle = {}     # (scheme, host, port) -> [_AsyncConn]
+        self._sems = {}     # (scheme, host, port) -> asyncio.Semaphore
+        self.stats = {'requests': 0, 'connects': 0, 'reused': 0, 'stale_retries': 0, 'timeouts': 0}
+
+    # ═══════════════════════════════════════
+    #  连接管理
+    # ═══════════════════════════════════════
+
+    async def _open(self, key):
+        scheme, host, port = key
+        self.stats['connects'] += 1
+        if scheme == 'https':
+            reader, writer = await asyncio.open_connection(host, port, ssl=self._ssl_ctx, server_hostname=host)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return _AsyncConn(reader, writer)
+
+    def _take_idle(self, key):
+        now = time.monotonic()
+        idle = self._idle.get(key, [])
+        while idle:
+            conn = idle.pop()
+            if now - conn.idle_since <= self.idle_timeout and not conn.reader.at_eof():
+                self.stats['reused'] += 1
+                return conn
+            conn.close()
+        return None
+
+    def _put_idle(self, key, conn):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_idle:
+            conn.idle_since = time.monotonic()
+            idle.append(conn)
+        else:
+            conn.close()
+
+    async def close(self):
+        for idle in self._idle.values():
+            for conn in idle:
+                conn.close()
+        self._idle.clear()
+
+    def idle_counts(self):
+        return {f"{h}:{p}": len(q) for (_, h, p), q in self._idle.items()}
+
+    # ═══════════════════════════════════════
+    #  请求
+    # ═══════════════════════════════════════
+
+    @staticmethod
+    async def _read_body(reader, headers):
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';', 1)[0].strip() or b'0', 16)
+                if size == 0:
+                    # 跳过 trailer
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return b''.join(chunks), True
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+        if 'content-length' in headers:
+            return await reader.readexactly(int(headers['content-length'])), True
+        # 既无长度也非分块：读到连接关闭，连接不可复用
+        return await reader.read(), False
+
+    async def _exchange(self, conn, method, host_header, path, headers, body):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host_header}", "Connection: keep-alive"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (body or b''))
+        await conn.writer.drain()
+
+        status_line = await conn.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("连接已被对端关闭")
+        parts = status_line.decode('latin-1').split(None, 2)
+        status, reason = int(parts[1]), (parts[2].strip() if len(parts) > 2 else '')
+        resp_headers = {}
+        while True:
+            line = await conn.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            k, _, v = line.decode('latin-1').partition(':')
+            resp_headers[k.strip().lower()] = v.strip()
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            data, reusable = b'', True
+        else:
+            data, reusable = await self._read_body(conn.reader, resp_headers)
+        reusable = reusable and resp_headers.get('connection', '').lower() != 'close'
+        return status, reason, resp_headers, data, reusable
+
+    async def _send(self, key, method, host_header, path, headers, body):
+        conn = self._take_idle(key)
+        reused = conn is not None
+        if conn is None:
+            conn = await self._open(key)
+        try:
+            try:
+                result = await self._exchange(conn, method, host_header, path, headers, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if not reused:
+                    raise
+                # 复用的连接已失效，换新连接重发一次
+                conn.close()
+                self.stats['stale_retries'] += 1
+                conn = await self._open(key)
+                result = await self._exchange(conn, method, host_header, path, headers, body)
+        except BaseException:
+            conn.close()
+            raise
+        if result[4]:
+            self._put_idle(key, conn)
+        else:
+            conn.close()
+        return result[:4]
+
+    async def request(self, url, method='GET', headers=None, body=None, timeout=None, raise_for_status=True):
+        """
+        发送请求并读取完整响应 (含重定向)，返回 HttpResponse
+        超过截止时间抛出 TimeoutError；同一主机并发数超过 per_host 时排队等待
+        """
+        timeout = timeout or self.timeout
+        try:
+            return await asyncio.wait_for(self._request(url, method, headers or {}, body, raise_for_status), timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise TimeoutError(f"请求超时 ({timeout}s): {safe_url(url)[:80]}")
+
+    async def _request(self, url, method, headers, body, raise_for_status):
+        for _ in range(self.max_redirects + 1):
+            parts = urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in ('http', 'https'):
+                raise ValueError(f"不支持的协议: {safe_url(url)[:80]}")
+            default_port = 443 if scheme == 'https' else 80
+            port = parts.port or default_port
+            key = (scheme, parts.hostname, port)
+            host_header = parts.hostname if port == default_port else f"{parts.hostname}:{port}"
+            path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+            self.stats['requests'] += 1
+
+            sem = self._sems.get(key)
+            if sem is None:
+                sem = self._sems[key] = asyncio.Semaphore(self.per_host)
+            async with sem:
+                status, reason, resp_headers, data = await self._send(key, method, host_header, path, headers, body)
+
+            if status in (301, 302, 303, 307, 308) and 'location' in resp_headers:
+                url = urljoin(url, resp_headers['location'])
+                if status == 303:
+                    method, body = 'GET', None
+                continue
+            if raise_for_status and status >= 400:
+                raise HttpStatusError(status, reason, url)
+            data = HttpPool._decode(data, resp_headers.get('content-encoding'))
+            return HttpResponse(status, reason, resp_headers, data, url)
+        raise HttpStatusError(310, 'Too many redirects', url)
+
+
+class AsyncRunner:
+    """常驻事件循环线程；同步代码通过 run() 提交协程并阻塞等待结果"""
+
+    def __init__(self, name="FetchLoop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._main, name=name, daemon=True)
+        self._thread.start()
+
+    def _main(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_loop(self):
+        return threading.current_thread() is self._thread
+
+    def run(self, coro, timeout=None):
+        """在事件循环中执行协程并返回结果 (不能在事件循环线程内调用)"""
+        if self.in_loop():
+            coro.close()
+            raise RuntimeError("不能在事件循环线程内同步等待协程")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def submit(self, coro):
+        """提交协程但不等待，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=2)
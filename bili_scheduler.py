@@ -0,0 +1,177 @@
+"""
+OmniMonitor B 站按 UP 主自适应轮询
+- 从投稿的发布时间 (created) 学习每个 UP 主的更新频率与常见发布时段
+- 轮询间隔按 1/√(当前时段的预计发布率) 分配：总请求量一定时，这样分配的平均发现延迟最小，
+  勤更的 UP 主、常发布的时段查得勤，月更的 UP 主、深夜时段查得少
+- 同一时刻最多发出一个请求，相邻请求至少间隔 spacing 秒；首次加入时按 UID 错开，避免集中突发
+"""
+
+import math
+import zlib
+import random
+from datetime import datetime
+
+DAY = 86400
+REF_RATE = 1.0 / DAY   # 参照：日更且发布时间均匀的 UP 主，按 check_interval 轮询
+
+
+class UploaderProfile:
+    """单个 UP 主的发布规律"""
+    __slots__ = ('uid', 'pubs', 'rate', 'hour_weight', 'next_due', 'last_interval', 'history_at')
+
+    MAX_PUBS = 30
+
+    def __init__(self, uid, pubs=None):
+        self.uid = uid
+        self.pubs = []            # 最近的发布时间戳 (升序)
+        self.rate = None          # 每秒发布次数
+        self.hour_weight = None   # 24 个时段的相对发布强度 (均匀分布时全为 1)
+        self.next_due = 0.0
+        self.last_interval = None
+        self.history_at = None    # 上次拉取近期投稿列表的时间 (投稿太少学不到规律时按 history_retry 重试)
+        self.learn(pubs or [])
+
+    def learn(self, created, bandwidth=1.5):
+        """合并新的发布时间，有新增时重新估计频率与时段分布，返回是否有新增"""
+        known = set(self.pubs)
+        new = [int(t) for t in created if t and int(t) not in known]
+        if not new:
+            return False
+        self.pubs = sorted(self.pubs + new)[-self.MAX_PUBS:]
+        self._fit(bandwidth)
+        return True
+
+    def _fit(self, bandwidth):
+        n = len(self.pubs)
+        if n < 3:
+            self.rate = self.hour_weight = None
+            return
+        # 发布率：以 1 周 1 更为先验做平滑，样本少时不至于过度自信
+        span = self.pubs[-1] - self.pubs[0]
+        self.rate = n / (span + 7 * DAY)
+
+        # 时段分布：对每次发布的小时做环形高斯核平滑，再与均匀分布混合
+        hours = [_hour_of(t) for t in self.pubs]
+        dens = []
+        for h in range(24):
+            x = h + 0.5
+            k = 0.0
+            for ph in hours:
+                d = abs(x - ph)
+                d = min(d, 24 - d)
+                k += math.exp(-d * d / (2 * bandwidth * bandwidth))
+            dens.append(k)
+        total = sum(dens) or 1.0
+        prior = 0.2   # 均匀分布所占比例
+        self.hour_weight = [24 * ((1 - prior) * k / total + prior / 24) for k in dens]
+
+    def intensity(self, ts):
+        """ts 所在时段的预计发布率 (次/秒)，未学到规律时返回 None"""
+        if self.rate is None:
+            return None
+        return self.rate * self.hour_weight[datetime.fromtimestamp(ts).hour]
+
+
+def _hour_of(ts):
+    dt = datetime.fromtimestamp(ts)
+    return dt.hour + dt.minute / 60.0
+
+
+class BiliPoller:
+    """
+    多 UP 主轮询调度 (由调度线程使用)，配置见 active_alert.bilibili
+    profiles 为持久化的 {uid: [发布时间戳, ...]}
+    """
+
+    def __init__(self, config=None, profiles=None):
+        self.uploaders = {}
+        self.last_request = 0.0
+        self._saved = dict(profiles or {})
+        self.configure(config)
+
+    def configure(self, config):
+        cfg = config or {}
+        self.adaptive = cfg.get('adaptive', True)
+        self.check_interval = cfg.get('check_interval', 1200)
+        self.min_interval = cfg.get('min_interval', 300)
+        self.max_interval = max(self.min_interval, cfg.get('max_interval', 21600))
+        self.spacing = cfg.get('spacing', 5)
+        self.jitter = cfg.get('jitter', 0.1)
+        self.bandwidth = cfg.get('hour_bandwidth', 1.5)
+        self.history_retry = cfg.get('history_retry', DAY)
+
+    def sync(self, uids, now):
+        """按配置增删 UP 主；新加入的按 UID 哈希在一个周期内错开首次查询"""
+        uids = [str(u) for u in uids]
+        for uid in list(self.uploaders):
+            if uid not in uids:
+                self._saved[uid] = self.uploaders.pop(uid).pubs
+        for uid in uids:
+            if uid not in self.uploaders:
+                p = self.uploaders[uid] = UploaderProfile(uid, self._saved.pop(uid, None))
+                p.next_due = now + (zlib.crc32(uid.encode()) % 1000) / 1000.0 * min(self.check_interval, 600)
+
+    def next(self, now):
+        """返回本次应查询的 UID (最逾期的一个)，没有到期或未满足请求间隔时返回 None"""
+        if now - self.last_request < self.spacing:
+            return None
+        due = [p for p in self.uploaders.values() if p.next_due <= now]
+        if not due:
+            return None
+        self.last_request = now
+        return min(due, key=lambda p: p.next_due).uid
+
+    def needs_history(self, uid, now):
+        """
+        尚未学到规律，需要拉取近期投稿列表
+        投稿不足 3 个时拉取后仍学不到规律，history_retry 内不再重复拉取，按固定间隔只查最新一条
+        """
+        p = self.uploaders[uid]
+        if not self.adaptive or p.rate is not None:
+            return False
+        return p.history_at is None or now - p.history_at >= self.history_retry
+
+    def history_fetched(self, uid, now):
+        self.uploaders[uid].history_at = now
+
+    def learn(self, uid, created):
+        return self.uploaders[uid].learn(created, self.bandwidth)
+
+    def schedule(self, uid, now):
+        """计算该 UP 主的下一次查询时间，返回间隔秒数"""
+        p = self.uploaders[uid]
+        interval = self._interval(p, now)
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        p.last_interval = int(interval)
+        p.next_due = now + interval
+        return p.last_interval
+
+    def _interval(self, p, now):
+        lam = p.intensity(now) if self.adaptive else None
+        if lam is None:
+            return self.check_interval
+        # 最优分配：间隔 ∝ 1/√λ，以日更均匀的 UP 主为参照 (对应 check_interval)
+        interval = self.check_interval * math.sqrt(REF_RATE / lam)
+        # 不让下一次查询跨过高发时段太多：取当前与半个间隔后两个时段中较短的间隔
+        lam_next = p.intensity(now + interval / 2)
+        if lam_next and lam_next > lam:
+            interval = self.check_interval * math.sqrt(REF_RATE / lam_next)
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def profiles(self):
+        """供持久化的发布时间记录"""
+        out = dict(self._saved)
+        out.update({uid: p.pubs for uid, p in self.uploaders.items() if p.pubs})
+        return out
+
+    def describe(self):
+        return {
+            uid: {
+                'videos': len(p.pubs),
+                'per_week': round(p.rate * 7 * DAY, 2) if p.rate else None,
+                'peak_hour': max(range(24), key=p.hour_weight.__getitem__) if p.hour_weight else None,
+                'interval': p.last_interval,
+                'next_due': int(p.next_due),
+            }
+            for uid, p in self.uploaders.items()
+        }
@@ -0,0 +1,142 @@
+"""
+OmniMonitor 按主机熔断
+- closed: 正常放行；连续失败达到阈值后进入 open
+- open: 直接失败 (不发请求)，等待退避时间，退避按连续熔断次数指数增长并加随机抖动
+- half_open: 退避结束后只放行一个探测请求，成功则恢复 closed，失败则重新 open
+断网期间各项抓取立即失败，调度循环不再被逐个超时拖住
+"""
+
+import re
+import time
+import random
+import threading
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+# last_error 会在 /api/status 中展示：去掉错误信息里 URL 的查询串 (可能带有 API Key 或坐标)
+_QUERY_RE = re.compile(r'\?\S*')
+
+
+class CircuitOpenError(ConnectionError):
+    """主机处于熔断状态，请求未发出"""
+
+    def __init__(self, host):
+        super().__init__(f"{host} 熔断中，跳过请求")
+        self.host = host
+
+
+class CircuitBreaker:
+    """单个主机的熔断器"""
+
+    def __init__(self, host, failure_threshold=3, base_backoff=30, max_backoff=1800, jitter=0.2):
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.state = CLOSED
+        self.failures = 0          # 连续失败次数
+        self.trips = 0             # 连续熔断次数 (决定退避时长)
+        self.retry_at = 0.0        # open 状态下允许探测的时间
+        self.probing = False
+        self.rejected = 0
+        self.last_error = None
+        self.changed_at = time.time()
+
+    def _set(self, state):
+        if state != self.state:
+            self.state = state
+            self.changed_at = time.time()
+
+    def allow(self, now=None):
+        """是否放行本次请求 (half_open 时只放行一个探测)"""
+        now = now or time.time()
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now >= self.retry_at:
+            self._set(HALF_OPEN)
+            self.probing = False
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.trips = 0
+        self.probing = False
+        self._set(CLOSED)
+
+    def record_failure(self, error=None, now=None):
+        now = now or time.time()
+        self.failures += 1
+        self.last_error = _QUERY_RE.sub('', str(error))[:120] if error else None
+        if self.state == OPEN:
+            return  # 熔断前已发出的请求陆续失败，不重复延长退避
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trips += 1
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (self.trips - 1))
+            backoff *= 1 + random.uniform(-self.jitter, self.jitter)
+            self.retry_at = now + backoff
+            self.probing = False
+            self._set(OPEN)
+
+    def to_dict(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'trips': self.trips,
+            'retry_in': round(max(0.0, self.retry_at - time.time()), 1) if self.state != CLOSED else 0,
+            'rejected': self.rejected,
+            'last_error': self.last_error,
+            'since': int(self.changed_at),
+        }
+
+
+class BreakerRegistry:
+    """按主机懒创建熔断器，配置见 fetcher.breaker"""
+
+    def __init__(self, config=None):
+        self._lock = threading.Lock()
+        self.breakers = {}
+        self.configure(config)
+
+    def configure(self, config):
+        cfg = config or {}
+        with self._lock:
+            self.enabled = cfg.get('enable', True)
+            self.params = {
+                'failure_threshold': cfg.get('failure_threshold', 3),
+                'base_backoff': cfg.get('base_backoff', 30),
+                'max_backoff': cfg.get('max_backoff', 1800),
+                'jitter': cfg.get('jitter', 0.2),
+            }
+            for b in self.breakers.values():
+                for k, v in self.params.items():
+                    setattr(b, k, v)
+
+    def _get(self, host):
+        b = self.breakers.get(host)
+        if b is None:
+            b = self.breakers[host] = CircuitBreaker(host, **self.params)
+        return b
+
+    def allow(self, host):
+        if not self.enabled:
+            return True
+        with self._lock:
+            return self._get(host).allow()
+
+    def record_success(self, host):
+        with self._lock:
+            self._get(host).record_success()
+
+    def record_failure(self, host, error=None):
+        with self._lock:
+            self._get(host).record_failure(error)
+
+    def snapshot(self):
+        """各主机熔断状态，供状态接口展示"""
+        with self._lock:
+            return {host: b.to_dict() for host, b in sorted(self.breakers.items())}
@@ -0,0 +1,762 @@
+"""
+OmniMonitor 指标采集器
+- ProcFile: 常驻文件句柄 + pread 重读 procfs / sysfs，避免每次 open / exists
+- 各采集器只负责读取与差分计算，返回扁平的指标字典，由 SystemMonitor 统一写入快照与历史
+- 采集器通过 @register_collector 注册，声明名称、默认周期与输出 schema，
+  采样引擎按配置 monitor.collectors 实例化，新增采集器无需改动调度器与 Web
+"""
+
+import os
+import re
+import json
+import time
+import fnmatch
+import heapq
+import shlex
+import subprocess
+from window_agg import SlidingWindow
+
+# 采集器类型注册表: 类型名 -> 类
+COLLECTOR_TYPES = {}
+
+
+def register_collector(cls):
+    """类装饰器：注册采集器类型"""
+    COLLECTOR_TYPES[cls.name] = cls
+    return cls
+
+
+def create_collector(type_name, config=None):
+    """按类型名创建采集器实例；未知类型抛出 KeyError"""
+    return COLLECTOR_TYPES[type_name](config or {})
+
+
+class ProcFile:
+    """
+    常驻句柄的 procfs / sysfs 文件
+    procfs / sysfs 在偏移 0 处读取时会重新生成内容，因此保持 fd 打开并用 pread 重读即可
+    """
+    __slots__ = ('path', 'fd', 'bufsize')
+
+    def __init__(self, path, bufsize=4096):
+        self.path = path
+        self.fd = None
+        self.bufsize = bufsize
+
+    def read(self):
+        """返回文件当前全部内容 (bytes)；文件不存在时抛出 OSError"""
+        for attempt in range(2):
+            try:
+                if self.fd is None:
+                    self.fd = os.open(self.path, os.O_RDONLY)
+                data = os.pread(self.fd, self.bufsize, 0)
+                # 缓冲区被填满说明内容可能被截断，扩容后重读
+                while len(data) >= self.bufsize:
+                    self.bufsize *= 2
+                    data = os.pread(self.fd, self.bufsize, 0)
+                return data
+            except OSError:
+                # 句柄失效 (例如设备热插拔)，关闭后重开一次
+                self.close()
+                if attempt:
+                    raise
+        return b''
+
+    def close(self):
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+
+@register_collector
+class MemoryCollector:
+    """/proc/meminfo 内存占用，mem_usage 为 5 分钟滑动平均，mem_now 为瞬时值"""
+    name = 'memory'
+    default_interval = 5
+    schema = {'mem_usage': '% (5m avg)', 'mem_now': '%'}
+
+    MEMINFO_RE = re.compile(rb'^(MemTotal|MemAvailable):\s+(\d+)', re.M)
+
+    def __init__(self, config=None, path='/proc/meminfo'):
+        self.file = ProcFile(path)
+        self.window = SlidingWindow(300)
+
+    def collect(self):
+        mem_info = dict(self.MEMINFO_RE.findall(self.file.read()))
+        total = int(mem_info.get(b'MemTotal', 0))
+        avail = int(mem_info.get(b'MemAvailable', 0))
+        if total <= 0:
+            return {}
+        usage = 100 * (total - avail) / total
+        self.window.add(time.monotonic(), usage)
+        return {'mem_usage': round(self.window.avg(), 1), 'mem_now': round(usage, 1)}
+
+    def close(self):
+        self.file.close()
+
+
+@register_collector
+class CpuCollector:
+    """
+    基于 /proc/stat 计数器差分的 CPU 利用率
+    输出总体与每核的 busy / iowait / steal 百分比
+    """
+    name = 'cpu'
+    default_interval = 5
+    schema = {
+        'cpu_usage': '%', 'cpu_iowait': '%', 'cpu_steal': '%',
+        'cpu_cores': '[{core, busy, iowait, steal}]', 'cpu<N>_usage': '%',
+    }
+
+    # cpu / cpuN 行: user nice system idle iowait irq softirq steal (guest 已计入 user)
+    LINE_RE = re.compile(rb'^cpu(\d*) +(\d+) (\d+) (\d+) (\d+) (\d+) (\d+) (\d+) (\d+)', re.M)
+
+    def __init__(self, config=None, path='/proc/stat'):
+        self.file = ProcFile(path, bufsize=8192)
+        self._prev = {}  # 核号 ('' 为总体) -> (total, idle, iowait, steal)
+
+    def _parse(self, data):
+        out = {}
+        for m in self.LINE_RE.finditer(data):
+            user, nice, system, idle, iowait, irq, softirq, steal = map(int, m.groups()[1:])
+            total = user + nice + system + idle + iowait + irq + softirq + steal
+            out[m.group(1)] = (total, idle, iowait, steal)
+        return out
+
+    def collect(self):
+        cur = self._parse(self.file.read())
+        prev, self._prev = self._prev, cur
+
+        def pct(core):
+            p = prev.get(core)
+            c = cur[core]
+            if p is None:
+                return None
+            dt = c[0] - p[0]
+            if dt <= 0:
+                return {'busy': 0.0, 'iowait': 0.0, 'steal': 0.0}
+            d_idle, d_iowait, d_steal = c[1] - p[1], c[2] - p[2], c[3] - p[3]
+            return {
+                'busy': round(100.0 * (dt - d_idle - d_iowait) / dt, 1),
+                'iowait': round(100.0 * d_iowait / dt, 1),
+                'steal': round(100.0 * d_steal / dt, 1),
+            }
+
+        total = pct(b'') if b'' in cur else None
+        if total is None:
+            # 首次采样没有基线，等下一个 tick 再输出
+            return {}
+        # 离线的核不出现在 /proc/stat 中，必须用行里的核号命名，不能用序号
+        cores = tuple({'core': int(k), **(pct(k) or {'busy': 0.0, 'iowait': 0.0, 'steal': 0.0})}
+                      for k in sorted((k for k in cur if k), key=int))
+        out = {
+            'cpu_usage': total['busy'],
+            'cpu_iowait': total['iowait'],
+            'cpu_steal': total['steal'],
+            'cpu_cores': cores,
+        }
+        for c in cores:
+            out[f"cpu{c['core']}_usage"] = c['busy']
+        return out
+
+    def close(self):
+        self.file.close()
+
+
+@register_collector
+class NetCollector:
+    """
+    基于 /proc/net/dev 计数器差分的网卡吞吐
+    输出每个网卡的 rx/tx 字节速率、包速率、错误与丢包速率 (每秒)
+    """
+    name = 'net'
+    default_interval = 5
+    schema = {
+        'net': '{iface: {rx_bps, tx_bps, rx_pps, tx_pps, rx_errs, tx_errs, rx_drop, tx_drop}}',
+        'net_rx_bps': 'B/s', 'net_tx_bps': 'B/s', 'net_<iface>_rx_bps': 'B/s', 'net_<iface>_tx_bps': 'B/s',
+    }
+
+    # /proc/net/dev 各字段在接收 / 发送段中的下标
+    FIELDS = (
+        ('rx_bytes', 0), ('rx_packets', 1), ('rx_errs', 2), ('rx_drop', 3),
+        ('tx_bytes', 8), ('tx_packets', 9), ('tx_errs', 10), ('tx_drop', 11),
+    )
+
+    def __init__(self, config=None, path='/proc/net/dev'):
+        cfg = config or {}
+        self.include = cfg.get('include', ['*'])
+        self.exclude = cfg.get('exclude', ['lo'])
+        # 判断计数器回绕是否可信的速率上限 (字节/秒)：优先取网卡协商速率，读不到时用 max_link_bps (默认 10 GbE)；
+        # 包计数按最小帧 64 字节换算
+        self.max_bps = float(cfg.get('max_link_bps', 1.25e9))
+        self._link_bps = {}
+        self.file = ProcFile(path, bufsize=8192)
+        self._prev = {}
+        self._prev_ts = None
+        self._match_cache = {}
+        self.removed_keys = []   # 本次采集发现已消失的网卡对应的指标名，由监控器清理窗口与历史
+
+    def _wanted(self, iface):
+        hit = self._match_cache.get(iface)
+        if hit is None:
+            if len(self._match_cache) > 256:   # veth 等临时网卡名不断变化，避免缓存无限增长
+                self._match_cache.clear()
+            hit = (any(fnmatch.fnmatchcase(iface, p) for p in self.include)
+                   and not any(fnmatch.fnmatchcase(iface, p) for p in self.exclude))
+            self._match_cache[iface] = hit
+        return hit
+
+    def _link_limit(self, iface):
+        """网卡速率上限 (字节/秒)，按网卡缓存；虚拟网卡的 speed 为 -1 或不可读"""
+        bps = self._link_bps.get(iface)
+        if bps is None:
+            try:
+                with open(f'/sys/class/net/{iface}/speed', 'rb') as f:
+                    mbps = int(f.read().strip())
+            except (OSError, ValueError):
+                mbps = -1
+            # 留一倍余量，避免协商速率与实际统计口径的差异造成误判
+            bps = self._link_bps[iface] = mbps * 125000.0 * 2 if mbps > 0 else self.max_bps
+        return bps
+
+    @staticmethod
+    def _delta(cur, prev, limit):
+        """
+        计数器差值，处理 32 / 64 位回绕
+        计数器变小且按回绕计算的差值超过 limit (该时间内不可能达到的量) 时，
+        视为网卡被重置或重建，返回 None
+        """
+        if cur >= prev:
+            return cur - prev
+        wrap = 1 << 32 if prev < (1 << 32) else 1 << 64
+        d = cur + wrap - prev
+        return d if d <= limit else None
+
+    def _parse(self, data):
+        out = {}
+        for line in data.split(b'\n')[2:]:
+            if b':' not in line:
+                continue
+            name, rest = line.split(b':', 1)
+            iface = name.strip().decode('ascii', errors='ignore')
+            if not self._wanted(iface):
+                continue
+            fields = rest.split()
+            if len(fields) < 12:
+                continue
+            out[iface] = tuple(int(fields[i]) for _, i in self.FIELDS)
+        return out
+
+    def collect(self):
+        now = time.monotonic()
+        cur = self._parse(self.file.read())
+        prev, prev_ts = self._prev, self._prev_ts
+        self._prev, self._prev_ts = cur, now
+        self.removed_keys = [f'net_{iface}_{d}_bps' for iface in prev if iface not in cur for d in ('rx', 'tx')]
+        for iface in prev:
+            if iface not in cur:
+                self._link_bps.pop(iface, None)   # 重建后的网卡可能协商出不同速率
+        if prev_ts is None or now <= prev_ts:
+            return {}
+
+        dt = now - prev_ts
+        net = {}
+        out = {}
+        total_rx = total_tx = 0.0
+        for iface, counters in cur.items():
+            p = prev.get(iface)
+            if p is None:
+                continue
+            rates = {}
+            link = self._link_limit(iface) * dt
+            for (field, _), c, o in zip(self.FIELDS, counters, p):
+                key = field.replace('_bytes', '_bps').replace('_packets', '_pps')
+                limit = link if field.endswith('_bytes') else link / 64
+                d = self._delta(c, o, limit)
+                if d is None:
+                    # 计数器被重置：丢弃本次样本，以当前值为新基线 (self._prev 已更新)
+                    rates = None
+                    break
+                rates[key] = round(d / dt, 1)
+            if rates is None:
+                continue
+            net[iface] = rates
+            total_rx += rates['rx_bps']
+            total_tx += rates['tx_bps']
+            out[f'net_{iface}_rx_bps'] = rates['rx_bps']
+            out[f'net_{iface}_tx_bps'] = rates['tx_bps']
+
+        out['net'] = net
+        out['net_rx_bps'] = round(total_rx, 1)
+        out['net_tx_bps'] = round(total_tx, 1)
+        return out
+
+    def close(self):
+        self.file.close()
+
+
+@register_collector
+class DiskCollector:
+    """
+    多挂载点磁盘采集
+    - 从 /proc/self/mounts 自动发现真实挂载点，按 (major, minor) 去重 (忽略 bind mount)
+    - 每个挂载点输出空间 / inode 占用，以及 /proc/diskstats 差分得到的 IOPS、吞吐、平均服务时间
+    """
+    name = 'disk'
+    default_interval = 30
+    schema = {
+        'disk_usage': '% (/)',
+        'disks': '{mountpoint: {usage, inode_usage, total_gb, free_gb, r_iops, w_iops, r_bps, w_bps, await_ms, util}}',
+        'disk_<mount>_usage': '%', 'disk_<mount>_await_ms': 'ms', 'disk_<mount>_util': '%',
+    }
+
+    # 伪文件系统，不参与磁盘监控
+    PSEUDO_FS = {
+        'proc', 'sysfs', 'tmpfs', 'devtmpfs', 'devpts', 'cgroup', 'cgroup2', 'pstore', 'debugfs',
+        'tracefs', 'securityfs', 'mqueue', 'hugetlbfs', 'configfs', 'fusectl', 'bpf', 'autofs',
+        'binfmt_misc', 'nsfs', 'ramfs', 'rpc_pipefs', 'efivarfs', 'selinuxfs', 'squashfs', 'overlay',
+        'nfsd', 'fuse.gvfsd-fuse', 'fuse.lxcfs',
+    }
+    SECTOR = 512
+    _ESCAPE_RE = re.compile(r'\\([0-7]{3})')
+
+    def __init__(self, config=None, mounts_path='/proc/self/mounts', stats_path='/proc/diskstats'):
+        cfg = config or {}
+        self.exclude = cfg.get('exclude', [])
+        self.rescan_interval = cfg.get('rescan_interval', 60)
+        self.mounts_file = ProcFile(mounts_path, bufsize=16384)
+        self.stats_file = ProcFile(stats_path, bufsize=16384)
+        self.mounts = []        # [(mountpoint, fstype, (major, minor))]
+        self._last_scan = 0
+        self._prev = {}         # (major, minor) -> 计数器元组
+        self._prev_ts = None
+
+    @staticmethod
+    def series_name(mountpoint):
+        """挂载点转历史序列名: / -> root, /mnt/usb -> mnt_usb"""
+        return mountpoint.strip('/').replace('/', '_') or 'root'
+
+    def _unescape(self, s):
+        return self._ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 8)), s)
+
+    def discover(self):
+        """重新发现挂载点 (启动、定期以及按需调用)"""
+        mounts = []
+        seen = set()
+        for line in self.mounts_file.read().decode('utf-8', errors='ignore').splitlines():
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            mountpoint, fstype = self._unescape(parts[1]), parts[2]
+            if fstype in self.PSEUDO_FS and mountpoint != '/':
+                continue
+            if any(fnmatch.fnmatchcase(mountpoint, p) for p in self.exclude):
+                continue
+            try:
+                st = os.stat(mountpoint)
+            except OSError:
+                continue
+            dev = (os.major(st.st_dev), os.minor(st.st_dev))
+            if dev in seen:
+                continue
+            seen.add(dev)
+            mounts.append((mountpoint, fstype, dev))
+        self.mounts = mounts
+        self._last_scan = time.monotonic()
+        return mounts
+
+    def _read_diskstats(self):
+        out = {}
+        for line in self.stats_file.read().split(b'\n'):
+            f = line.split()
+            if len(f) < 14:
+                continue
+            # reads, sectors_read, ms_reading, writes, sectors_written, ms_writing, ms_io
+            out[(int(f[0]), int(f[1]))] = (int(f[3]), int(f[5]), int(f[6]), int(f[7]), int(f[9]), int(f[10]), int(f[12]))
+        return out
+
+    def collect(self):
+        now = time.monotonic()
+        if not self.mounts or now - self._last_scan >= self.rescan_interval:
+            self.discover()
+
+        try:
+            stats = self._read_diskstats()
+        except OSError:
+            stats = {}
+        prev, prev_ts = self._prev, self._prev_ts
+        self._prev, self._prev_ts = stats, now
+        dt = now - prev_ts if prev_ts else 0
+
+        disks = {}
+        out = {}
+        for mountpoint, fstype, dev in self.mounts:
+            try:
+                st = os.statvfs(mountpoint)
+            except OSError:
+                continue
+            total = st.f_blocks * st.f_frsize
+            if total <= 0:
+                continue
+            info = {
+                'device': f"{dev[0]}:{dev[1]}",
+                'fstype': fstype,
+                'usage': round(100 * (total - st.f_bfree * st.f_frsize) / total, 1),
+                'inode_usage': round(100 * (st.f_files - st.f_ffree) / st.f_files, 1) if st.f_files else None,
+                'total_gb': round(total / 1024 ** 3, 2),
+                'free_gb': round(st.f_bavail * st.f_frsize / 1024 ** 3, 2),
+            }
+
+            cur, old = stats.get(dev), prev.get(dev)
+            if cur and old and dt > 0:
+                d = [c - o for c, o in zip(cur, old)]
+                ios = d[0] + d[3]
+                info.update({
+                    'r_iops': round(d[0] / dt, 1),
+                    'w_iops': round(d[3] / dt, 1),
+                    'r_bps': round(d[1] * self.SECTOR / dt, 1),
+                    'w_bps': round(d[4] * self.SECTOR / dt, 1),
+                    'await_ms': round((d[2] + d[5]) / ios, 1) if ios > 0 else 0.0,
+                    'util': round(min(100.0, d[6] / (dt * 10)), 1),
+                })
+
+            disks[mountpoint] = info
+            name = self.series_name(mountpoint)
+            out[f'disk_{name}_usage'] = info['usage']
+            if 'await_ms' in info:
+                out[f'disk_{name}_await_ms'] = info['await_ms']
+                out[f'disk_{name}_util'] = info['util']
+
+        out['disks'] = disks
+        if '/' in disks:
+            out['disk_usage'] = disks['/']['usage']
+        return out
+
+    def close(self):
+        self.mounts_file.close()
+        self.stats_file.close()
+
+
+@register_collector
+class ProcessCollector:
+    """
+    增量进程表采集 (Top-N)
+    - 维护 PID -> (starttime, CPU ticks, 采样时刻) 状态表，CPU% 由两次采样差分得出
+    - 每个 tick 只轮询 batch 个进程，400 个进程的机器也不会出现采集尖峰
+    - 已退出的 PID 每个 tick 剪除，starttime 变化视为 PID 复用
+    """
+    name = 'procs'
+    default_interval = 15
+    schema = {'procs': '{count, top_cpu: [{pid, name, cpu, rss_mb}], top_rss: [...]}'}
+
+    def __init__(self, config=None, proc_root='/proc'):
+        cfg = config or {}
+        self.top_n = cfg.get('top_n', 5)
+        self.batch = max(16, cfg.get('batch', 128))
+        self.proc_root = proc_root
+        self.clk_tck = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        self.table = {}      # pid -> [name, starttime, ticks, ts, cpu%, rss_bytes]
+        self._queue = []     # 本轮待扫描的 PID
+        self._last = {}
+
+    def _read_stat(self, pid):
+        fd = os.open(f"{self.proc_root}/{pid}/stat", os.O_RDONLY)
+        try:
+            data = os.read(fd, 1024)
+        finally:
+            os.close(fd)
+        # comm 可能包含空格和括号，以最后一个 ')' 为界
+        lpar, rpar = data.find(b'('), data.rfind(b')')
+        fields = data[rpar + 2:].split()
+        name = data[lpar + 1:rpar].decode('utf-8', errors='replace')
+        # 字段序号参考 proc(5): utime=14 stime=15 starttime=22 rss=24
+        return name, int(fields[19]), int(fields[11]) + int(fields[12]), int(fields[21]) * self.page_size
+
+    def collect(self):
+        now = time.monotonic()
+        try:
+            alive = {int(d) for d in os.listdir(self.proc_root) if d.isdigit()}
+        except OSError:
+            return self._last
+
+        # 剪除已退出进程
+        for pid in [p for p in self.table if p not in alive]:
+            del self.table[pid]
+
+        # 新一轮扫描：新进程优先，其余按 PID 顺序
+        if not self._queue:
+            fresh = sorted(alive - self.table.keys())
+            self._queue = fresh + sorted(self.table.keys())
+        chunk, self._queue = self._queue[:self.batch], self._queue[self.batch:]
+
+        for pid in chunk:
+            if pid not in alive:
+                continue
+            try:
+                name, start, ticks, rss = self._read_stat(pid)
+            except (OSError, ValueError, IndexError):
+                self.table.pop(pid, None)
+                continue
+            st = self.table.get(pid)
+            cpu = 0.0
+            if st and st[1] == start and now > st[3]:
+                cpu = round(100.0 * (ticks - st[2]) / self.clk_tck / (now - st[3]), 1)
+            self.table[pid] = [name, start, ticks, now, cpu, rss]
+
+        def row(pid, st):
+            return {'pid': pid, 'name': st[0], 'cpu': st[4], 'rss_mb': round(st[5] / 1048576, 1)}
+
+        items = self.table.items()
+        self._last = {'procs': {
+            'count': len(alive),
+            'top_cpu': [row(p, st) for p, st in heapq.nlargest(self.top_n, items, key=lambda kv: kv[1][4])],
+            'top_rss': [row(p, st) for p, st in heapq.nlargest(self.top_n, items, key=lambda kv: kv[1][5])],
+        }}
+        return self._last
+
+    def close(self):
+        self.table.clear()
+
+
+@register_collector
+class ThermalCollector:
+    """
+    多温区温度采集
+    - 启动时 (及按需) 枚举 thermal_zone* / hwmon*/temp*_input / 海思 pm_cpu，缓存路径与常驻句柄
+    - 每个 tick 读取全部传感器，不再重复探测路径
+    - cpu_temp 取主传感器 (可在配置中指定，默认优先海思 / cpu / soc 类型)
+    """
+    name = 'thermal'
+    default_interval = 10
+    schema = {'cpu_temp': '°C', 'cpu_temp_sensor': 'id', 'temps': '{sensor_id: °C}', 'temp_<id>': '°C'}
+
+    HISILICON_PATH = '/proc/msp/pm_cpu'
+    HISILICON_RE = re.compile(rb'temperature\s*=\s*(\d+)')
+    _ID_RE = re.compile(r'[^\w]+')
+
+    def __init__(self, config=None, thermal_root='/sys/class/thermal', hwmon_root='/sys/class/hwmon'):
+        cfg = config or {}
+        self.primary = cfg.get('primary')
+        self.thermal_root = thermal_root
+        self.hwmon_root = hwmon_root
+        self.sensors = []            # [(sensor_id, label, ProcFile, 是否海思格式)]
+        self._rescan = True
+
+    @staticmethod
+    def _read_text(path):
+        try:
+            with open(path, 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return ''
+
+    def request_rescan(self):
+        """请求在下一个 tick 重新发现传感器 (可从其他线程调用)"""
+        self._rescan = True
+
+    def discover(self):
+        for _, _, f, _ in self.sensors:
+            f.close()
+        found = []
+        if os.path.exists(self.HISILICON_PATH):
+            found.append(('hisi_cpu', 'HiSilicon CPU', self.HISILICON_PATH, True))
+
+        try:
+            zones = sorted((d for d in os.listdir(self.thermal_root) if d.startswith('thermal_zone')),
+                           key=lambda d: int(d[12:] or 0))
+        except OSError:
+            zones = []
+        for z in zones:
+            base = os.path.join(self.thermal_root, z)
+            if os.path.exists(os.path.join(base, 'temp')):
+                label = self._read_text(os.path.join(base, 'type')) or z
+                found.append((label, label, os.path.join(base, 'temp'), False))
+
+        try:
+            hwmons = sorted(d for d in os.listdir(self.hwmon_root) if d.startswith('hwmon'))
+        except OSError:
+            hwmons = []
+        for h in hwmons:
+            base = os.path.join(self.hwmon_root, h)
+            chip = self._read_text(os.path.join(base, 'name')) or h
+            try:
+                inputs = sorted(f for f in os.listdir(base) if f.startswith('temp') and f.endswith('_input'))
+            except OSError:
+                continue
+            for inp in inputs:
+                prefix = inp[:-len('_input')]
+                label = self._read_text(os.path.join(base, prefix + '_label')) or prefix
+                found.append((f"{chip}_{label}", f"{chip} {label}", os.path.join(base, inp), False))
+
+        # 传感器 ID 去重 (例如多个同类型温区)
+        sensors, seen = [], {}
+        for raw_id, label, path, hisi in found:
+            sid = self._ID_RE.sub('_', raw_id).strip('_').lower() or 'sensor'
+            n = seen.get(sid, 0)
+            seen[sid] = n + 1
+            if n: sid = f"{sid}_{n}"
+            sensors.append((sid, label, ProcFile(path, bufsize=256 if hisi else 64), hisi))
+        self.sensors = sensors
+        self._rescan = False
+        return [(sid, label, f.path) for sid, label, f, _ in sensors]
+
+    def _primary_id(self, temps):
+        if self.primary in temps:
+            return self.primary
+        for sid in temps:
+            if sid == 'hisi_cpu' or 'cpu' in sid or 'soc' in sid:
+                return sid
+        return next(iter(temps), None)
+
+    def collect(self):
+        if self._rescan:
+            self.discover()
+        temps = {}
+        for sid, _, f, hisi in self.sensors:
+            try:
+                data = f.read()
+                if hisi:
+                    m = self.HISILICON_RE.search(data)
+                    if not m: continue
+                    temps[sid] = float(m.group(1))
+                else:
+                    val = int(data.strip())
+                    temps[sid] = val / 1000.0 if val > 200 else float(val)
+            except (OSError, ValueError):
+                continue
+
+        out = {'temps': temps, 'cpu_temp': 0}
+        primary = self._primary_id(temps)
+        if primary is not None:
+            out['cpu_temp'] = temps[primary]
+            out['cpu_temp_sensor'] = primary
+        for sid, t in temps.items():
+            out[f'temp_{sid}'] = t
+        return out
+
+    def describe(self):
+        """传感器清单，供 API 展示"""
+        return [{'id': sid, 'label': label, 'path': f.path} for sid, label, f, _ in self.sensors]
+
+    def close(self):
+        for _, _, f, _ in self.sensors:
+            f.close()
+
+
+@register_collector
+class PressureCollector:
+    """
+    负载与压力阻塞 (PSI)
+    - /proc/loadavg: 1 / 5 / 15 分钟负载及每核负载
+    - /proc/pressure/{cpu,memory,io}: some / full 的 avg10 / 60 / 300，
+      以及由 total 计数器差分得到的本周期阻塞占比 (内核未启用 PSI 时自动跳过)
+    """
+    name = 'pressure'
+    default_interval = 10
+    schema = {
+        'load1': 'load', 'load5': 'load', 'load15': 'load', 'load_per_core': 'load1 / cores',
+        'psi': '{resource: {some|full: {avg10, avg60, avg300, stall}}}',
+        'psi_<resource>_<some|full>': '% (avg10)', 'psi_<resource>_stall': '% (some, 本周期)',
+    }
+
+    RESOURCES = ('cpu', 'memory', 'io')
+    PSI_RE = re.compile(rb'^(some|full) avg10=([\d.]+) avg60=([\d.]+) avg300=([\d.]+) total=(\d+)', re.M)
+
+    def __init__(self, config=None, loadavg_path='/proc/loadavg', pressure_root='/proc/pressure'):
+        self.loadavg = ProcFile(loadavg_path, bufsize=128)
+        self.cores = os.cpu_count() or 1
+        self.files = {r: ProcFile(os.path.join(pressure_root, r), bufsize=256)
+                      for r in self.RESOURCES if os.path.exists(os.path.join(pressure_root, r))}
+        self._prev = {}  # (resource, some|full) -> (monotonic 秒, total 微秒)
+
+    def collect(self):
+        parts = self.loadavg.read().split()
+        load1, load5, load15 = (float(x) for x in parts[:3])
+        out = {
+            'load1': load1, 'load5': load5, 'load15': load15,
+            'load_per_core': round(load1 / self.cores, 2),
+        }
+
+        now = time.monotonic()
+        psi = {}
+        for res, f in list(self.files.items()):
+            try:
+                data = f.read()
+            except OSError:
+                # 内核编译了 PSI 但以 psi=0 启动时读取会失败，之后不再尝试
+                f.close()
+                del self.files[res]
+                continue
+            lines = {}
+            for kind, a10, a60, a300, total in self.PSI_RE.findall(data):
+                kind = kind.decode()
+                total = int(total)
+                prev = self._prev.get((res, kind))
+                self._prev[(res, kind)] = (now, total)
+                stall = None
+                if prev and now > prev[0]:
+                    stall = round(min(100.0, (total - prev[1]) / ((now - prev[0]) * 1e4)), 2)
+                lines[kind] = {'avg10': float(a10), 'avg60': float(a60), 'avg300': float(a300), 'stall': stall}
+                out[f'psi_{res}_{kind}'] = float(a10)
+                if kind == 'some' and stall is not None:
+                    out[f'psi_{res}_stall'] = stall
+            psi[res] = lines
+        if psi:
+            out['psi'] = psi
+        return out
+
+    def close(self):
+        self.loadavg.close()
+        for f in self.files.values():
+            f.close()
+
+
+@register_collector
+class ScriptCollector:
+    """
+    自定义脚本采集
+    执行 command (argv 列表，不经过 shell)，输出可以是 JSON 对象或 "key value" 行，
+    数值字段以 <prefix>_<key> 形式写入快照与历史
+    只能在本地文件 scripts.json 中定义 (见 monitor.load_script_collectors)，Web 端保存的配置中不允许出现
+    """
+    name = 'script'
+    default_interval = 60
+    schema = {'<prefix>_<key>': 'number'}
+
+    def __init__(self, config=None):
+        cfg = config or {}
+        command = cfg.get('command') or []
+        # 字符串按 shell 词法拆分成 argv，但不交给 shell 执行 (不支持管道 / 重定向)
+        self.command = shlex.split(command) if isinstance(command, str) else [str(a) for a in command]
+        self.prefix = cfg.get('prefix') or cfg.get('name', 'script')
+        self.timeout = cfg.get('timeout', 5)
+
+    def _parse(self, text):
+        text = text.strip()
+        if text.startswith('{'):
+            return json.loads(text)
+        out = {}
+        for line in text.splitlines():
+            parts = line.split(None, 1)
+            if len(parts) == 2:
+                out[parts[0]] = parts[1]
+        return out
+
+    def collect(self):
+        if not self.command:
+            return {}
+        res = subprocess.run(self.command, capture_output=True, text=True, timeout=self.timeout)
+        out = {}
+        for k, v in self._parse(res.stdout).items():
+            try:
+                out[f"{self.prefix}_{k}"] = float(v)
+            except (TypeError, ValueError):
+                continue
+        return out
+
+    def close(self):
+        pass
@@ -1,12 +1,28 @@
-import urllib.request
 import urllib.parse
-import urllib.error
+import http.client
 import json
-import gzip
 import time
-import socket
+import asyncio
+import functools
+from instrument import METRICS
+from http_pool import HttpPool, HttpStatusError, safe_url
+from async_http import AsyncHttpClient, AsyncRunner
+from rate_limit import RateLimiter
+from circuit_breaker import BreakerRegistry, CircuitOpenError
+from fetch_cache import ResponseCache, SingleFlight, normalize_url
+from route_cache import RouteCache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# 未配置 fetcher.rate_limits 时的默认限速 (和风天气免费版 QPS 较低)
+DEFAULT_RATE_LIMITS = {'devapi.qweather.com': {'rate': 2, 'burst': 3}}
 
 class DataFetcher:
+    """
+    外部数据抓取
+    所有接口的实现都是协程 (xxx_async)，在常驻的事件循环线程中并发执行；
+    同名的同步方法只是提交协程并等待结果的薄封装，返回值与原来一致
+    """
+
     def __init__(self, config, logger=None):
         self.cfg = config
         self.keys = config['api_keys']
@@ -16,35 +32,200 @@ class DataFetcher:
             "Accept-Encoding": "gzip, deflate",
             "Accept": "*/*"
         }
+        fetch_cfg = config.get('fetcher', {})
+        pool_cfg = fetch_cfg.get('pool', {})
+        # 网络后端: async (默认，非阻塞套接字) 或 thread (阻塞连接池 + 线程池，用于排查兼容问题)
+        self.engine = fetch_cfg.get('engine', 'async')
+        self.timeout = pool_cfg.get('timeout', 10)        # 单次尝试的超时
+        self.deadline = fetch_cfg.get('deadline', 30)     # 单个请求 (含重试与限速排队) 的截止时间
+        self.runner = AsyncRunner()
+        # 异步客户端: 按主机复用长连接并限制并发数
+        self.client = AsyncHttpClient({**pool_cfg, **fetch_cfg.get('async', {})})
+        # 按主机复用的阻塞长连接池 (thread 后端使用)
+        self.pool = HttpPool(pool_cfg, logger)
+        # 按主机共享的令牌桶 (例如和风天气的 QPS 限制)，替代请求间的固定 sleep
+        self.limiter = RateLimiter(fetch_cfg.get('rate_limits', DEFAULT_RATE_LIMITS))
+        # 按主机熔断: 断网或上游故障时快速失败，指数退避后单个请求探测恢复
+        self.breakers = BreakerRegistry(fetch_cfg.get('breaker', {}))
+        # 按规范化 URL 缓存的响应 (调度器与 Web 共用同一个 DataFetcher，因此缓存也共享)
+        self.cache = ResponseCache(fetch_cfg.get('cache', {}))
+        # stale-while-revalidate 的后台刷新任务 (持有引用防止被回收)
+        self._bg_tasks = set()
+        # 通勤路线缓存 (按方式 / 时段设置有效期) 与按星期、时段的耗时画像
+        self.routes = RouteCache(fetch_cfg.get('routes', {}), logger)
+        # 并发的相同请求 (多个仪表盘同时刷新、报告与告警检查重叠) 只发出一次
+        self.flight = SingleFlight()
+        # 小型共享线程池 (thread 后端在其中执行阻塞请求)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, fetch_cfg.get('workers', 3)), thread_name_prefix="Fetcher")
 
     def _log(self, level, msg):
         if self.logger: getattr(self.logger, level)(msg)
 
-    def _request(self, url, headers=None, max_retries=1, delay=2):
+    def apply_config(self, config):
+        """热重载：更新 API Key、限速、缓存与熔断规则 (连接池与线程池保持不变)"""
+        self.cfg = config
+        self.keys = config['api_keys']
+        self.limiter.configure(config.get('fetcher', {}).get('rate_limits', DEFAULT_RATE_LIMITS))
+        self.cache.configure(config.get('fetcher', {}).get('cache', {}))
+        self.breakers.configure(config.get('fetcher', {}).get('breaker', {}))
+        self.routes.configure(config.get('fetcher', {}).get('routes', {}))
+
+    def close(self):
+        """关闭事件循环、线程池与连接池中的空闲连接"""
+        try:
+            self.runner.run(self.client.close(), timeout=2)
+        except Exception:
+            pass
+        self.runner.stop()
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+    def _run(self, coro):
+        """
+        同步封装：在事件循环线程中执行协程并等待结果
+        单个请求已受 deadline 约束，这里再留一个 deadline 给合并等待与限速排队；
+        超时后取消协程并抛出 TimeoutError，调用线程不会被无限期挂住
+        """
+        future = self.runner.submit(coro)
+        try:
+            return future.result(self.deadline * 2)
+        except FutureTimeout:
+            future.cancel()
+            self._log('error', f"抓取超过 {self.deadline * 2}s 未完成，已放弃等待")
+            raise TimeoutError(f"抓取超时 ({self.deadline * 2}s)")
+
+    async def _guarded_get(self, url, headers):
+        """
+        经过熔断与限速的 GET
+        熔断中直接抛出 CircuitOpenError；网络错误、超时与 5xx 计为主机失败，其余响应计为成功
+        """
+        host = urllib.parse.urlsplit(url).hostname or ''
+        if not self.breakers.allow(host):
+            raise CircuitOpenError(host)
+        try:
+            wait = self.limiter.reserve(host)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            res = await self._http_get(url, headers)
+        except HttpStatusError as e:
+            if e.status >= 500:
+                self.breakers.record_failure(host, e)
+            else:
+                self.breakers.record_success(host)
+            raise
+        except BaseException as e:
+            # 包括被截止时间取消的请求，保证 half_open 的探测名额不会被占住
+            self.breakers.record_failure(host, e)
+            raise
+        self.breakers.record_success(host)
+        return res
+
+    async def _http_get(self, url, headers):
+        """按配置的后端发起一次 GET，返回 HttpResponse"""
+        if self.engine == 'thread':
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(self.pool.request, url, headers=headers))
+        return await self.client.request(url, headers=headers, timeout=self.timeout)
+
+    def _request(self, url, headers=None, max_retries=1, delay=2, max_age=None):
+        """同步版本的 _request_async"""
+        return self._run(self._request_async(url, headers, max_retries, delay, max_age))
+
+    async def _request_async(self, url, headers=None, max_retries=1, delay=2, max_age=None):
         """
-        通用JSON请求方法 (带重试机制)
+        通用JSON请求方法 (带缓存与重试机制)，按域名记录耗时 (fetch.<host>)，返回 None 计为失败
         :param max_retries: 最大重试次数 (默认失败后重试1次)
         :param delay: 重试前的等待秒数
+        :param max_age: 可接受的最大缓存年龄 (秒)，None 使用接口类别的 TTL，0 强制刷新
         """
+        state, res = self.cache.lookup(url, max_age)
+        if state == 'fresh':
+            return res
+        if state == 'stale':
+            # 先返回旧值，后台刷新 (同一 URL 的刷新仍然只有一个在途)
+            task = asyncio.get_running_loop().create_task(self._revalidate(url, headers, max_retries, delay))
+            self._bg_tasks.add(task)
+            task.add_done_callback(self._bg_tasks.discard)
+            return res
+        return await self.flight.do_async(normalize_url(url), self._fetch_json, url, headers, max_retries, delay)
+
+    async def _revalidate(self, url, headers, max_retries, delay):
+        try:
+            await self.flight.do_async(normalize_url(url), self._fetch_json, url, headers, max_retries, delay)
+        except Exception as e:
+            self._log('warning', f"后台刷新失败: {safe_url(url)[:50]}... {e}")
+
+    async def _fetch_json(self, url, headers, max_retries, delay):
+        """实际发起请求并写入缓存 (同一 URL 同时只有一个请求在途)"""
+        w0 = time.perf_counter()
+        meta = {'cpu': 0.0, 'etag': None, 'last_modified': None, 'not_modified': False}
+        try:
+            res = await asyncio.wait_for(self._request_once(url, headers, max_retries, delay, meta), self.deadline)
+        except asyncio.TimeoutError:
+            self._log('error', f"请求超过截止时间 ({self.deadline}s): {safe_url(url)[:50]}...")
+            res = None
+        host = urllib.parse.urlsplit(url).hostname or 'unknown'
+        # 事件循环线程上的 CPU 时间会混入其他协程，这里只统计本请求解码 / 解析所用的 CPU
+        METRICS.record(f"fetch.{host}", time.perf_counter() - w0, meta['cpu'], error=res is None)
+        if not meta['not_modified'] and self._cacheable(res):
+            self.cache.put(url, res, meta['etag'], meta['last_modified'])
+        return res
+
+    @staticmethod
+    def _cacheable(res):
+        """只缓存业务上成功的响应 (和风 code=200、B站 code=0、高德 status=1、高德 v4 骑行 errcode=0)"""
+        if not isinstance(res, dict):
+            return res is not None
+        code = res.get('code')
+        if code is not None and str(code) not in ('200', '0'):
+            return False
+        errcode = res.get('errcode')
+        if errcode is not None and str(errcode) != '0':
+            return False
+        return res.get('status') != '0'
+
+    async def _request_once(self, url, headers, max_retries, delay, meta):
         if not headers: headers = self.headers
+
+        # 有缓存校验器时发送条件请求，上游未变化则返回 304，省去下载、解压与解析
+        validators = self.cache.validators(url)
+        if validators:
+            headers = dict(headers)
+            if validators[0]: headers['If-None-Match'] = validators[0]
+            if validators[1]: headers['If-Modified-Since'] = validators[1]
         
         # 尝试次数 = 1次正常请求 + max_retries次重试
         for attempt in range(max_retries + 1):
             try:
-                req = urllib.request.Request(url, headers=headers)
-                with urllib.request.urlopen(req, timeout=10) as f:
-                    raw = f.read()
-                    if f.headers.get('Content-Encoding') == 'gzip':
-                        raw = gzip.decompress(raw)
-                    res_json = json.loads(raw.decode('utf-8'))
-                    # 针对和风天气的特殊处理：即使HTTP 200，JSON里的code也可能不是200
-                    return res_json
+                res = await self._guarded_get(url, headers)
+                if res.status == 304:
+                    cached = self.cache.revalidated(url)
+                    if cached is not None:
+                        meta['not_modified'] = True
+                        return cached
+                    # 缓存条目恰好被淘汰：去掉条件头重新请求
+                    headers = {k: v for k, v in headers.items() if not k.startswith('If-')}
+                    res = await self._guarded_get(url, headers)
+                meta['etag'] = res.header('etag')
+                meta['last_modified'] = res.header('last-modified')
+                c0 = time.thread_time()
+                try:
+                    res_json = json.loads(res.text())
+                finally:
+                    meta['cpu'] += time.thread_time() - c0
+                # 针对和风天气的特殊处理：即使HTTP 200，JSON里的code也可能不是200
+                return res_json
+
+            except CircuitOpenError as e:
+                # 熔断中：不重试也不等待，直接失败
+                self._log('debug', str(e))
+                return None
             
-            except (urllib.error.URLError, socket.timeout) as e:
-                # 只有是网络相关错误时才重试
+            except (OSError, http.client.HTTPException) as e:
+                # 只有是网络相关错误时才重试 (超时 TimeoutError 也属于 OSError)
                 if attempt < max_retries:
-                    self._log('warning', f"请求失败，{delay}秒后重试 ({attempt + 1}/{max_retries}): {url[:30]}... 错误: {e}")
-                    time.sleep(delay) # 延时等待
+                    self._log('warning', f"请求失败，{delay}秒后重试 ({attempt + 1}/{max_retries}): {safe_url(url)[:30]}... 错误: {e}")
+                    await asyncio.sleep(delay) # 延时等待
                     continue # 进入下一次循环
                 else:
                     # 重试次数用尽，返回None
@@ -52,59 +233,76 @@ class DataFetcher:
                     return None
                     
             except json.JSONDecodeError:
-                self._log('warning', f"API返回了非JSON数据: {url[:30]}...")
+                self._log('warning', f"API返回了非JSON数据: {safe_url(url)[:30]}...")
                 return None
             except Exception as e:
-                self._log('error', f"请求最终失败: {url[:50]}... {e}")
+                self._log('error', f"请求最终失败: {safe_url(url)[:50]}... {e}")
                 return None
         
         return None
 
-    def get_daily_quote(self, raw=False):
+    def get_daily_quote(self, raw=False, max_age=None):
+        return self._run(self.get_daily_quote_async(raw, max_age))
+
+    async def get_daily_quote_async(self, raw=False, max_age=None):
         """每日一言"""
-        res = self._request("https://v1.hitokoto.cn/?c=i&c=d&c=k")
+        res = await self._request_async("https://v1.hitokoto.cn/?c=i&c=d&c=k", max_age=max_age)
         if res:
             if raw: return f"{res['hitokoto']} —— {res.get('from', '佚名')}"
             return f"{res['hitokoto']} <span style='font-size:12px;color:#888'>—— {res.get('from', '佚名')}</span>"
         return "保持热爱，奔赴山海。"
 
-    def get_commute_full_report(self, start, end, city_name=None):
+    def get_commute_full_report(self, start, end, city_name=None, max_age=None):
+        return self._run(self.get_commute_full_report_async(start, end, city_name, max_age))
+
+    async def get_commute_full_report_async(self, start, end, city_name=None, max_age=None):
         key = self.keys['amap']
+        c_enc = urllib.parse.quote(city_name) if city_name else None
+        url_car = f"https://restapi.amap.com/v3/direction/driving?origin={start}&destination={end}&key={key}&strategy=0"
+        url_bus = f"https://restapi.amap.com/v3/direction/transit/integrated?origin={start}&destination={end}&city={c_enc}&key={key}&strategy=0"
+        url_bike = f"https://restapi.amap.com/v4/direction/bicycling?origin={start}&destination={end}&key={key}"
+
+        # 三种出行方式并发请求 (未提供城市时不查公交)，骑行 / 公交路线通常直接命中路线缓存
+        async def _skip():
+            return None
+        car, bus, bike = await asyncio.gather(
+            self._route_async('driving', url_car, start, end, max_age),
+            self._route_async('transit', url_bus, start, end, max_age) if city_name else _skip(),
+            self._route_async('bicycling', url_bike, start, end, max_age),
+        )
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.routes.save)
+
         rows = []
         td_style = "padding:6px 4px; border-bottom:1px solid #eee; text-align:center; font-size:13px;"
         link_style = "text-decoration:none; color:#007bff; font-weight:bold;"
-        
+
+        def _row(label, r, map_url):
+            if r.get('fallback'):
+                # 上游失败，显示画像中的常态耗时
+                cell = f"<b>{r['minutes']}</b>分 <span style='color:#999; font-size:11px;'>(常态)</span>"
+            else:
+                cell = f"<b>{r['minutes']}</b>分"
+                delta = r['minutes'] - r['usual'] if r.get('usual') is not None else 0
+                if delta:
+                    color = '#d9534f' if delta > 0 else '#28a745'
+                    cell += f" <span style='color:{color}; font-size:11px;'>{delta:+d}</span>"
+            km = f"{r['km']}km" if r.get('km') is not None else "-"
+            return f"<tr><td style='{td_style}'>{label}</td><td style='{td_style} color:#333'>{cell}</td><td style='{td_style} color:#999'>{km}</td><td style='{td_style}'><a href='{map_url}' style='{link_style}'>路线&gt;</a></td></tr>"
+
         # 1. 驾车
-        url_car = f"https://restapi.amap.com/v3/direction/driving?origin={start}&destination={end}&key={key}&strategy=0"
-        res = self._request(url_car)
-        if res and res.get('status') == '1' and res['route']['paths']:
-            p = res['route']['paths'][0]
-            minutes = int(p['duration']) // 60
-            km = int(p['distance']) // 1000
+        if car:
             map_url = f"https://uri.amap.com/navigation?from={start},起点&to={end},终点&mode=car&policy=0&src=push_bot&coordinate=gaode&callnative=1"
-            rows.append(f"<tr><td style='{td_style}'>🚗 驾车</td><td style='{td_style} color:#333'><b>{minutes}</b>分</td><td style='{td_style} color:#999'>{km}km</td><td style='{td_style}'><a href='{map_url}' style='{link_style}'>路线&gt;</a></td></tr>")
+            rows.append(_row("🚗 驾车", car, map_url))
 
         # 2. 公交
-        if city_name:
-            c_enc = urllib.parse.quote(city_name)
-            url_bus = f"https://restapi.amap.com/v3/direction/transit/integrated?origin={start}&destination={end}&city={c_enc}&key={key}&strategy=0"
-            res = self._request(url_bus)
-            if res and res.get('status') == '1' and res['route']['transits']:
-                p = res['route']['transits'][0]
-                minutes = int(p['duration']) // 60
-                km = int(p['distance']) // 1000
-                map_url = f"https://uri.amap.com/navigation?from={start},起点&to={end},终点&mode=bus&city={c_enc}&src=push_bot&coordinate=gaode&callnative=1"
-                rows.append(f"<tr><td style='{td_style}'>🚌 公交</td><td style='{td_style} color:#333'><b>{minutes}</b>分</td><td style='{td_style} color:#999'>{km}km</td><td style='{td_style}'><a href='{map_url}' style='{link_style}'>路线&gt;</a></td></tr>")
+        if bus:
+            map_url = f"https://uri.amap.com/navigation?from={start},起点&to={end},终点&mode=bus&city={c_enc}&src=push_bot&coordinate=gaode&callnative=1"
+            rows.append(_row("🚌 公交", bus, map_url))
 
         # 3. 骑行
-        url_bike = f"https://restapi.amap.com/v4/direction/bicycling?origin={start}&destination={end}&key={key}"
-        res = self._request(url_bike)
-        if res and res.get('data') and res['data']['paths']:
-            p = res['data']['paths'][0]
-            minutes = int(p['duration']) // 60
-            km = int(p['distance']) // 1000
+        if bike:
             map_url = f"https://uri.amap.com/navigation?from={start},起点&to={end},终点&mode=ride&src=push_bot&coordinate=gaode&callnative=1"
-            rows.append(f"<tr><td style='{td_style}'>🚲 骑行</td><td style='{td_style} color:#333'><b>{minutes}</b>分</td><td style='{td_style} color:#999'>{km}km</td><td style='{td_style}'><a href='{map_url}' style='{link_style}'>路线&gt;</a></td></tr>")
+            rows.append(_row("🚲 骑行", bike, map_url))
 
         if not rows: return "暂时无法获取路况 (可能网络中断或Key无效)"
         
@@ -116,6 +314,38 @@ class DataFetcher:
         </table>
         """
 
+    async def _route_async(self, mode, url, start, end, max_age=None):
+        """
+        单一方式的通勤耗时 {'minutes', 'km', 'usual'}，先查路线缓存，
+        请求失败时退回画像 / 旧结果 (带 fallback 标记)，都没有时返回 None
+        """
+        usual = self.routes.usual(start, end, mode)
+        hit = self.routes.get(start, end, mode, max_age)
+        if hit:
+            return {**hit, 'usual': usual}
+        parsed = self._parse_route(mode, await self._request_async(url, max_age=max_age))
+        if parsed is None:
+            return self.routes.fallback(start, end, mode)
+        minutes, km = parsed
+        self.routes.put(start, end, mode, minutes, km)
+        return {'minutes': minutes, 'km': km, 'usual': usual}
+
+    @staticmethod
+    def _parse_route(mode, res):
+        """高德路线规划响应 -> (分钟, 公里)，无结果返回 None"""
+        try:
+            if mode == 'bicycling':
+                p = res['data']['paths'][0] if res and res.get('data') else None
+            elif res and res.get('status') == '1':
+                p = (res['route']['transits'] if mode == 'transit' else res['route']['paths'])[0]
+            else:
+                p = None
+        except (KeyError, IndexError, TypeError):
+            p = None
+        if p is None:
+            return None
+        return int(p['duration']) // 60, int(p['distance']) // 1000
+
     def get_weather_chart_url(self, hourly_data):
         try:
             times = []
@@ -142,37 +372,27 @@ class DataFetcher:
             return f"https://quickchart.io/chart?w=500&h=250&c={urllib.parse.quote(json.dumps(config))}"
         except: return ""
 
-    def get_weather_now(self, location_code):
+    def get_weather_now(self, location_code, max_age=None):
+        return self._run(self.get_weather_now_async(location_code, max_age))
+
+    async def get_weather_now_async(self, location_code, max_age=None):
         url = f"https://devapi.qweather.com/v7/weather/now?location={location_code}&key={self.keys['qweather']}"
-        res = self._request(url)
+        res = await self._request_async(url, max_age=max_age)
         if res and res['code'] == '200':
             return res['now']
         return None
 
-    def get_weather_simple_html(self, locations):
-        html = ""
-        is_first = True
-        has_data = False
-        
-        for i, loc in enumerate(locations):
-            # 修复点 2: 增加请求间隔，防止触发 API 频率限制
-            if i > 0:
-                time.sleep(1.5) 
+    async def _weather_card(self, loc, max_age=None):
+        """单个地点的 24h 天气卡片内容，返回 (标题后缀, 正文 HTML, 是否成功)"""
+        url = f"https://devapi.qweather.com/v7/weather/24h?location={loc['code']}&key={self.keys['qweather']}"
+        # 频率限制由 devapi.qweather.com 的令牌桶统一控制，失败重试只需短暂等待
+        res = await self._request_async(url, max_retries=2, delay=1, max_age=max_age)
 
-            url = f"https://devapi.qweather.com/v7/weather/24h?location={loc['code']}&key={self.keys['qweather']}"
-            
-            res = self._request(url, max_retries=2, delay=3)
-            
-            content = ""
-            title_suffix = ""
-            
-            if res and res['code'] == '200':
-                has_data = True
-                hourly = res['hourly']
-                now = hourly[0]
-                chart_url = self.get_weather_chart_url(hourly)
-                title_suffix = f"{now['text']} {now['temp']}°C"
-                content = f"""
+        if res and res['code'] == '200':
+            hourly = res['hourly']
+            now = hourly[0]
+            chart_url = self.get_weather_chart_url(hourly)
+            content = f"""
                 <div style="padding:10px; border:1px solid #eee; border-top:none; border-radius:0 0 5px 5px;">
                     <p style="margin:5px 0; font-size:12px; color:#666">
                         当前: {now['text']} {now['temp']}°C | 风向: {now['windDir']} | 湿度: {now['humidity']}%
@@ -180,11 +400,24 @@ class DataFetcher:
                     <img src="{chart_url}" style="width:100%; border-radius:5px; margin-top:5px;">
                 </div>
                 """
-            else:
-                title_suffix = "获取失败"
-                content = "<p style='padding:10px; color:#999'>暂无数据 (网络异常或服务不可用)</p>"
+            return f"{now['text']} {now['temp']}°C", content, True
+        return "获取失败", "<p style='padding:10px; color:#999'>暂无数据 (网络异常或服务不可用)</p>", False
+
+    def get_weather_simple_html(self, locations, max_age=None):
+        return self._run(self.get_weather_simple_html_async(locations, max_age))
 
-            open_attr = "open" if is_first else ""
+    async def get_weather_simple_html_async(self, locations, max_age=None):
+        """
+        多地点天气 (并发获取)
+        各地点在事件循环中并发请求，按原顺序拼接 HTML，总耗时接近单次请求 + 限速排队
+        """
+        if not locations:
+            return "暂无天气数据"
+        cards = await asyncio.gather(*(self._weather_card(loc, max_age) for loc in locations))
+
+        html = ""
+        for i, (loc, (title_suffix, content, _)) in enumerate(zip(locations, cards)):
+            open_attr = "open" if i == 0 else ""
             html += f"""
             <details {open_attr} style="margin-bottom:8px; border:1px solid #ddd; border-radius:5px;">
                 <summary style="background:#f5f5f5; padding:8px; cursor:pointer; font-weight:bold; outline:none; list-style:none;">
@@ -193,44 +426,65 @@ class DataFetcher:
                 {content}
             </details>
             """
-            is_first = False
-        
-        if not has_data and html == "": return "暂无天气数据"
         return html
 
-    def get_gold_price(self):
+    def get_gold_price(self, max_age=None):
+        return self._run(self.get_gold_price_async(max_age))
+
+    async def get_gold_price_async(self, max_age=None):
         # 黄金价格接口有时不稳定，也可以增加 retry=2
+        ts = int(time.time() * 1000)
+        url = f"https://api.jijinhao.com/sQuoteCenter/realTime.htm?code=JO_92233&isCalc=true&_={ts}"
+        # 时间戳参数 _ 不参与缓存键，1 分钟内的告警检查与报告共用同一个价格
+        hit, price = self.cache.get(url, max_age)
+        if hit:
+            return price
+        return await self.flight.do_async(normalize_url(url), self._fetch_gold, url)
+
+    async def _fetch_gold(self, url):
+        w0 = time.perf_counter()
+        price = None
         try:
-            ts = int(time.time() * 1000)
-            url = f"https://api.jijinhao.com/sQuoteCenter/realTime.htm?code=JO_92233&isCalc=true&_={ts}"
             headers = self.headers.copy()
             headers["Referer"] = "https://quote.cngold.org/"
             
-            # 这里也可以使用 _request 方法来简化，但由于解析逻辑特殊，保留原逻辑或稍微改造
-            # 为了简单起见，这里仅演示核心 Weather/Request 部分的改动，保留原 Gold 逻辑
-            # 如果想让 Gold 也支持重试，可以直接在 loop 中包裹这里的逻辑
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=10) as f:
-                raw = f.read()
-                if f.headers.get('Content-Encoding') == 'gzip': raw = gzip.decompress(raw)
-                content = raw.decode('utf-8', errors='ignore')
-                if "quote_json" in content:
-                    start, end = content.find('{'), content.rfind('}') + 1
-                    data = json.loads(content[start:end])
-                    if "JO_92233" in data: return float(data["JO_92233"]["q63"])
-                if "hq_str" in content:
-                    items = content[content.find('"')+1 : content.rfind('"')].split(',')
-                    if len(items) > 3: return float(items[3])
-        except (urllib.error.URLError, socket.timeout):
-            return None 
+            # 返回的是 JS 片段而非 JSON，解析逻辑特殊，不走 _request，但同样经过熔断、限速与连接复用
+            res = await self._guarded_get(url, headers)
+            price = self._parse_gold(res.text(errors='ignore'))
+        except (OSError, http.client.HTTPException):
+            pass
         except Exception as e: 
             pass
+        METRICS.record("fetch.api.jijinhao.com", time.perf_counter() - w0, 0.0, error=price is None)
+        if price is not None:
+            self.cache.put(url, price)
+        return price
+
+    @staticmethod
+    def _parse_gold(content):
+        if "quote_json" in content:
+            start, end = content.find('{'), content.rfind('}') + 1
+            data = json.loads(content[start:end])
+            if "JO_92233" in data: return float(data["JO_92233"]["q63"])
+        if "hq_str" in content:
+            items = content[content.find('"')+1 : content.rfind('"')].split(',')
+            if len(items) > 3: return float(items[3])
         return None
 
-    def get_bilibili_latest(self, uid):
-        url = f"https://api.bilibili.com/x/space/arc/search?mid={uid}&ps=1&tid=0&pn=1&order=pubdate"
-        res = self._request(url)
+    def get_bilibili_latest(self, uid, max_age=None):
+        return self._run(self.get_bilibili_latest_async(uid, max_age))
+
+    async def get_bilibili_latest_async(self, uid, max_age=None):
+        vlist = await self.get_bilibili_videos_async(uid, 1, max_age)
+        return vlist[0] if vlist else None
+
+    def get_bilibili_videos(self, uid, count=30, max_age=None):
+        return self._run(self.get_bilibili_videos_async(uid, count, max_age))
+
+    async def get_bilibili_videos_async(self, uid, count=30, max_age=None):
+        """最近 count 个投稿 (按发布时间倒序)，失败返回 None"""
+        url = f"https://api.bilibili.com/x/space/arc/search?mid={uid}&ps={count}&tid=0&pn=1&order=pubdate"
+        res = await self._request_async(url, max_age=max_age)
         if res and res.get('code') == 0:
-            vlist = res.get('data', {}).get('list', {}).get('vlist', [])
-            if vlist: return vlist[0]
+            return res.get('data', {}).get('list', {}).get('vlist', [])
         return None
@@ -0,0 +1,201 @@
+"""
+OmniMonitor 外部接口响应缓存
+- 以规范化 URL 为键 (scheme / host 小写，查询参数排序，去掉 _ 等防缓存参数)
+- 按接口类别设置 TTL: 天气 10 分钟、金价 1 分钟、一言 1 小时、路线 5 分钟
+- 容量有上限，超出后按 LRU 淘汰；按类别统计命中 / 未命中
+- 调用方可指定可接受的最大缓存年龄 (max_age)，0 表示强制刷新
+- 保存 ETag / Last-Modified 用于条件请求；在 stale 时限内先返回旧值、后台刷新
+- SingleFlight: 并发的相同请求只发出一次，等待者共享结果
+"""
+
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# 主机 -> 接口类别
+ENDPOINT_CLASSES = {
+    'devapi.qweather.com': 'weather',
+    'api.jijinhao.com': 'gold',
+    'v1.hitokoto.cn': 'quote',
+    'restapi.amap.com': 'route',
+    'api.bilibili.com': 'bilibili',
+}
+
+# 各类别默认 TTL (秒)，0 表示不缓存
+DEFAULT_TTLS = {'weather': 600, 'gold': 60, 'quote': 3600, 'route': 300, 'bilibili': 0, 'other': 0}
+
+# 各类别过期后仍可先返回旧值、后台刷新的时限 (秒)，0 表示不返回旧值
+DEFAULT_STALE_TTLS = {'weather': 1800, 'gold': 0, 'quote': 86400, 'route': 0, 'bilibili': 0, 'other': 0}
+
+# 规范化时忽略的查询参数 (时间戳防缓存参数)
+IGNORED_PARAMS = ('_', '_t')
+
+
+def normalize_url(url):
+    """规范化 URL 作为缓存键"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    netloc = (parts.hostname or '') + (f":{parts.port}" if parts.port else '')
+    return f"{parts.scheme.lower()}://{netloc}{parts.path or '/'}?{urlencode(query)}"
+
+
+def endpoint_class(url):
+    return ENDPOINT_CLASSES.get(urlsplit(url).hostname or '', 'other')
+
+
+class _Entry:
+    __slots__ = ('stored_at', 'cls', 'value', 'etag', 'last_modified')
+
+    def __init__(self, stored_at, cls, value, etag=None, last_modified=None):
+        self.stored_at = stored_at
+        self.cls = cls
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class ResponseCache:
+    """
+    线程安全的 TTL + LRU 缓存
+    过期条目不立即删除 (仅按 LRU 淘汰)：其校验器 (ETag / Last-Modified) 用于条件请求，
+    在 stale 时限内还可以先返回旧值、后台刷新
+    """
+
+    def __init__(self, config=None):
+        self._lock = threading.Lock()
+        self._data = OrderedDict()   # 键 -> _Entry
+        self.stats_by_class = {}     # 类别 -> {'hit': n, 'stale': n, 'miss': n, 'revalidated': n}
+        self.configure(config)
+
+    def configure(self, config):
+        cfg = config or {}
+        with self._lock:
+            self.enabled = cfg.get('enable', True)
+            self.max_entries = max(1, int(cfg.get('max_entries', 256)))
+            self.ttls = {**DEFAULT_TTLS, **cfg.get('ttl', {})}
+            self.stale_ttls = {**DEFAULT_STALE_TTLS, **cfg.get('stale', {})}
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def ttl(self, cls):
+        return self.ttls.get(cls, self.ttls.get('other', 0))
+
+    def _count(self, cls, name):
+        st = self.stats_by_class.get(cls)
+        if st is None:
+            st = self.stats_by_class[cls] = {'hit': 0, 'stale': 0, 'miss': 0, 'revalidated': 0}
+        st[name] += 1
+
+    def lookup(self, url, max_age=None):
+        """
+        查询缓存，返回 (状态, 值)，状态为 'fresh' / 'stale' / 'miss'
+        - fresh: 年龄不超过类别 TTL 与 max_age 中较小者
+        - stale: 已过 TTL 但仍在 stale 时限内，可先返回旧值再后台刷新 (指定了 max_age 时不返回旧值)
+        """
+        cls = endpoint_class(url)
+        limit = self.ttl(cls)
+        if max_age is not None:
+            limit = min(limit, max_age)
+        key = normalize_url(url)
+        with self._lock:
+            item = self._data.get(key) if self.enabled else None
+            if item is not None:
+                age = time.time() - item.stored_at
+                if age <= limit:
+                    self._data.move_to_end(key)
+                    self._count(cls, 'hit')
+                    return 'fresh', item.value
+                stale_limit = self.stale_ttls.get(cls, 0)
+                if max_age is None and stale_limit > 0 and age <= self.ttl(cls) + stale_limit:
+                    self._data.move_to_end(key)
+                    self._count(cls, 'stale')
+                    return 'stale', item.value
+            self._count(cls, 'miss')
+            return 'miss', None
+
+    def get(self, url, max_age=None):
+        """查询新鲜缓存，返回 (是否命中, 值)"""
+        state, value = self.lookup(url, max_age)
+        if state == 'stale':
+            return False, None
+        return state == 'fresh', value
+
+    def validators(self, url):
+        """返回已缓存条目的 (ETag, Last-Modified)，不论是否过期；无条目时返回 None"""
+        with self._lock:
+            item = self._data.get(normalize_url(url))
+            if item is None or not (item.etag or item.last_modified):
+                return None
+            return item.etag, item.last_modified
+
+    def revalidated(self, url):
+        """上游返回 304：刷新条目时间并返回缓存值 (条目已被淘汰时返回 None)"""
+        with self._lock:
+            item = self._data.get(normalize_url(url))
+            if item is None:
+                return None
+            item.stored_at = time.time()
+            self._count(item.cls, 'revalidated')
+            return item.value
+
+    def put(self, url, value, etag=None, last_modified=None):
+        """写入缓存 (类别 TTL 为 0 且没有校验器时不保存)"""
+        cls = endpoint_class(url)
+        if not self.enabled or (self.ttl(cls) <= 0 and not (etag or last_modified)):
+            return
+        key = normalize_url(url)
+        with self._lock:
+            self._data[key] = _Entry(time.time(), cls, value, etag, last_modified)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """命中统计，供 API 展示"""
+        with self._lock:
+            by_class = {}
+            for cls, st in self.stats_by_class.items():
+                total = st['hit'] + st['stale'] + st['miss']
+                by_class[cls] = {**st, 'hit_rate': round((st['hit'] + st['stale']) / total, 3) if total else None}
+            return {'entries': len(self._data), 'max_entries': self.max_entries, 'classes': by_class}
+
+
+class SingleFlight:
+    """
+    同键请求合并：同一时刻相同键只有一个协程真正发起请求，
+    其余并发调用者等待它完成并拿到同一个结果 (或同一个异常)
+    """
+
+    def __init__(self):
+        self._futures = {}    # 键 -> asyncio.Task (只在事件循环线程内访问)
+        self.stats = {'leaders': 0, 'shared': 0}
+
+    async def do_async(self, key, coro_fn, *args, **kwargs):
+        """
+        仅在同一个事件循环内使用：
+        首个调用者把 coro_fn(*args) 作为独立任务启动，同键的所有调用者 (包括首个) 都通过 shield 等待它，
+        任一调用者被取消 (例如同步等待超时) 只会取消自己的等待，共享的请求照常完成
+        """
+        task = self._futures.get(key)
+        if task is not None:
+            self.stats['shared'] += 1
+        else:
+            self.stats['leaders'] += 1
+            task = self._futures[key] = asyncio.get_running_loop().create_task(coro_fn(*args, **kwargs))
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._futures.get(key) is task:
+            del self._futures[key]
+        if not task.cancelled():
+            task.exception()  # 标记异常已被读取，避免无人等待时的警告
+
+    def in_flight(self):
+        return len(self._futures)
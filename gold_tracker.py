@@ -0,0 +1,331 @@
+"""
+OmniMonitor 金价跟踪
+- GoldPoller: 自适应轮询间隔
+  按对数收益率的 EWMA 估计波动率与漂移，推算价格走到区间边缘 (low / high) 所需的时间，
+  离边缘越近、波动越快间隔越短；行情平静或休市时拉长到 max_interval
+- GoldHistory: 金价序列 (raw / 1m / 1h 三层环形缓冲 + mmap 持久化)，
+  每次写入时增量更新均线、当日高低点与 N 分钟涨跌幅
+- GoldRule: 基于上述指标的告警规则，例如 "change 30m <= -1.5"
+"""
+
+import os
+import re
+import math
+import time
+from collections import deque
+from datetime import datetime
+from history_store import HistoryStore, HistoryFile
+from window_agg import WindowAggregator, WindowRule
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 上海黄金交易所延期合约交易时段 (夜盘跨零点)，周一至周五
+DEFAULT_TRADING_HOURS = ["09:00-11:30", "13:30-15:30", "20:00-02:30"]
+
+
+def _parse_sessions(spec):
+    """["09:00-11:30", ...] -> [(起始分钟, 结束分钟)]"""
+    sessions = []
+    for item in spec or []:
+        try:
+            a, b = item.split('-')
+            h1, m1 = map(int, a.split(':'))
+            h2, m2 = map(int, b.split(':'))
+            sessions.append((h1 * 60 + m1, h2 * 60 + m2))
+        except ValueError:
+            continue
+    return sessions
+
+
+class GoldPoller:
+    """金价自适应轮询 (由调度线程使用)，配置见 active_alert.gold"""
+
+    def __init__(self, config=None):
+        self.alpha = 0.2
+        self.last_price = None
+        self.last_ts = None
+        self.var = None           # 每分钟对数收益率方差的 EWMA
+        self.drift = 0.0          # 每分钟对数收益率的 EWMA
+        self.samples = 0
+        self.next_due = 0.0
+        self.last_interval = None
+        self.last_reason = ''
+        self.configure(config)
+
+    def configure(self, config):
+        cfg = config or {}
+        self.adaptive = cfg.get('adaptive', True)
+        self.base_interval = cfg.get('check_interval', 600)
+        self.min_interval = cfg.get('min_interval', 60)
+        self.max_interval = max(self.min_interval, cfg.get('max_interval', 1800))
+        self.safety = cfg.get('safety_factor', 0.25)       # 间隔取预计触边时间的比例
+        self.sessions = _parse_sessions(cfg.get('trading_hours', DEFAULT_TRADING_HOURS))
+        self.trading_days = set(cfg.get('trading_days', [1, 2, 3, 4, 5]))
+
+    def market_open(self, ts=None):
+        """是否处于交易时段 (夜盘跨零点时，凌晨部分归属前一交易日)"""
+        if not self.sessions:
+            return True
+        dt = datetime.fromtimestamp(ts or time.time())
+        minute = dt.hour * 60 + dt.minute
+        weekday = dt.isoweekday()
+        for start, end in self.sessions:
+            if start <= end:
+                if weekday in self.trading_days and start <= minute < end:
+                    return True
+            else:
+                if weekday in self.trading_days and minute >= start:
+                    return True
+                prev_day = weekday - 1 or 7
+                if prev_day in self.trading_days and minute < end:
+                    return True
+        return False
+
+    def observe(self, price, ts):
+        """记录一次报价，增量更新波动率与漂移"""
+        if price is None or price <= 0:
+            return
+        if self.last_price is not None and ts > self.last_ts:
+            dt_min = (ts - self.last_ts) / 60.0
+            r = math.log(price / self.last_price)
+            var = r * r / dt_min
+            rate = r / dt_min
+            if self.var is None:
+                self.var, self.drift = var, rate
+            else:
+                self.var += self.alpha * (var - self.var)
+                self.drift += self.alpha * (rate - self.drift)
+        self.last_price, self.last_ts = price, ts
+        self.samples += 1
+
+    def schedule(self, ts, low, high):
+        """按当前状态计算下一次查询时间，返回间隔秒数"""
+        interval, reason = self._interval(ts, low, high)
+        self.last_interval, self.last_reason = interval, reason
+        self.next_due = ts + interval
+        return interval
+
+    def _interval(self, ts, low, high):
+        if not self.adaptive:
+            return self.base_interval, 'fixed'
+        if not self.market_open(ts):
+            return self.max_interval, 'closed'
+        price = self.last_price
+        if price is None or self.var is None or self.samples < 3:
+            return min(self.base_interval, self.max_interval), 'warmup'
+        if price <= low or price >= high:
+            # 已越界 (提醒由冷却控制)，按常规间隔跟踪即可
+            return max(self.min_interval, min(self.base_interval, self.max_interval)), 'outside'
+
+        # 到最近边缘的对数距离
+        dist = min(math.log(price / low) if low > 0 else float('inf'), math.log(high / price))
+        # 随机游走到达距离 dist 的典型时间 (dist/σ)²，以及按当前漂移直线到达的时间
+        sigma = math.sqrt(self.var)
+        t_vol = (dist / sigma) ** 2 if sigma > 0 else float('inf')
+        t_drift = dist / abs(self.drift) if self.drift else float('inf')
+        eta_min = min(t_vol, t_drift)
+        if eta_min == float('inf'):
+            return self.max_interval, 'quiet'
+        interval = eta_min * 60 * self.safety
+        reason = 'drift' if t_drift < t_vol else 'volatility'
+        return int(max(self.min_interval, min(self.max_interval, interval))), reason
+
+    def describe(self):
+        return {
+            'price': self.last_price,
+            'sigma_per_min': round(math.sqrt(self.var), 6) if self.var else None,
+            'drift_per_min': round(self.drift, 6),
+            'interval': self.last_interval,
+            'reason': self.last_reason,
+            'next_due': int(self.next_due),
+        }
+
+
+# ═══════════════════════════════════════
+#  历史序列与指标
+# ═══════════════════════════════════════
+
+class GoldHistory:
+    """
+    金价历史与增量指标，配置见 active_alert.gold.history
+    写入来自调度线程；Web 线程只读取已发布的 latest 字典与分层序列，请求时不重新计算
+    """
+    KEY = 'gold'
+
+    def __init__(self, config=None, logger=None):
+        cfg = config or {}
+        self.logger = logger
+        # 自适应轮询最短 60s 一个点：raw 约 2 天，1m 2 天，1h 90 天
+        self.store = HistoryStore((self.KEY,), {
+            'raw_points': cfg.get('raw_points', 2880),
+            'minute_points': cfg.get('minute_points', 2880),
+            'hour_points': cfg.get('hour_points', 2160),
+            'max_series': 1,
+        })
+        self.ma_spans = sorted(int(m) * 60 for m in cfg.get('ma_minutes', [30, 60, 240]))
+        self.change_spans = sorted(int(m) * 60 for m in cfg.get('change_minutes', [30, 60]))
+        self.windows = WindowAggregator(self.ma_spans)   # 均线窗口，由调度线程在 record() 中写入
+        self._recent = deque()    # (ts, price)，保留到最长涨跌幅跨度之前的一个点
+        self.day = None
+        self.day_open = self.day_high = self.day_low = None
+        self.latest = {}          # 最近一次写入后发布的指标 (整体替换，读取无需加锁)
+
+        self.flush_interval = max(10, int(cfg.get('flush_interval', 600)))
+        self._last_flush = time.monotonic()
+        self.file = None
+        if cfg.get('enable', True):
+            path = cfg.get('path', '.gold.omts')
+            if not os.path.isabs(path):
+                path = os.path.join(BASE_DIR, path)
+            self.file = HistoryFile(path, self.store, logger=logger)
+
+    def _log(self, level, msg):
+        if self.logger: getattr(self.logger, level)(msg)
+
+    def open(self):
+        """打开持久化文件，并用保存的原始点重建均线 / 当日 / 涨跌幅状态，返回回放的点数"""
+        if self.file is None:
+            return 0
+        try:
+            self.file.open()
+        except Exception as e:
+            self._log('error', f"金价历史文件打开失败，仅保留内存历史: {e}")
+            self.file = None
+            return 0
+        now = time.time()
+        lookback = max(self.ma_spans + self.change_spans + [86400])
+        raw = self.store.query(self.KEY, 'raw', now - lookback)
+        for ts, price in zip(raw['ts'], raw['val']):
+            self._update(ts, price)
+        return len(raw['ts'])
+
+    def add(self, ts, price):
+        """记录一次报价并更新指标"""
+        if not price:
+            return
+        self.store.add(self.KEY, ts, price)
+        self._update(ts, float(price))
+        if self.file and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _update(self, ts, price):
+        self.windows.add(self.KEY, ts, price)
+
+        self._recent.append((ts, price))
+        keep = ts - max(self.change_spans, default=0)
+        while len(self._recent) > 1 and self._recent[1][0] <= keep:
+            self._recent.popleft()
+
+        day = datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
+        if day != self.day:
+            self.day, self.day_open, self.day_high, self.day_low = day, price, price, price
+        else:
+            self.day_high = max(self.day_high, price)
+            self.day_low = min(self.day_low, price)
+
+        self.latest = {
+            'ts': int(ts),
+            'price': round(price, 2),
+            'ma': {f"{s // 60}m": self.ma(s, ts) for s in self.ma_spans},
+            'change': {f"{s // 60}m": self.change_pct(s, ts) for s in self.change_spans},
+            'day': {
+                'date': self.day,
+                'open': round(self.day_open, 2),
+                'high': round(self.day_high, 2),
+                'low': round(self.day_low, 2),
+                'change': _pct(price, self.day_open),
+            },
+        }
+
+    def ma(self, span, now=None):
+        """span 秒内报价的均值"""
+        value = self.windows.stat(self.KEY, span, 'avg', now)
+        return round(value, 2) if value is not None else None
+
+    def change_pct(self, span, now=None):
+        """
+        相对 span 秒前报价的涨跌幅 (%)，取该时刻及之前最近的一个点作为基准
+        历史不足 span 时返回 None
+        """
+        if not self._recent:
+            return None
+        now = now or self._recent[-1][0]
+        cutoff = now - span
+        base = None
+        for ts, price in self._recent:
+            if ts > cutoff:
+                break
+            base = price
+        if base is None:
+            return None
+        return _pct(self._recent[-1][1], base)
+
+    def ensure_span(self, kind, span):
+        """规则引用了未配置的跨度时追加 (新窗口从此刻开始积累)"""
+        if kind == 'ma' and span not in self.ma_spans:
+            self.windows.ensure_window(self.KEY, span)
+            self.ma_spans = sorted(self.ma_spans + [span])
+        elif kind == 'change' and span not in self.change_spans:
+            self.change_spans = sorted(self.change_spans + [span])
+
+    def query(self, tier='1m', since=0):
+        return self.store.query(self.KEY, tier, since)
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if self.file:
+            try:
+                self.file.flush()
+            except Exception as e:
+                self._log('error', f"金价历史刷盘失败: {e}")
+
+    def close(self):
+        if self.file:
+            try:
+                self.file.close()
+            except Exception as e:
+                self._log('error', f"金价历史文件关闭失败: {e}")
+
+
+def _pct(value, base):
+    return round((value / base - 1) * 100, 3) if base else None
+
+
+class GoldRule(WindowRule):
+    """
+    金价指标告警规则 (时间单位、比较运算与解析沿用 WindowRule)
+    取值来自 GoldHistory 的已发布指标，用 check(history) 求值
+    语法: "<change|ma> <N><s|m|h> <op> <阈值>" 或 "<price|day_change> <op> <阈值>"
+    例如: "change 30m <= -1.5" (30 分钟内跌幅达 1.5%)，"ma 4h < 1120"，"day_change >= 2"
+    """
+    PATTERN = re.compile(
+        r'^\s*(?:(change|ma)\s+(\d+)\s*([smh])|(price|day_change))\s*(>=|<=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$'
+    )
+    LABEL = '金价规则'
+
+    def __init__(self, text, kind, span, op, threshold):
+        super().__init__(text, GoldHistory.KEY, kind, span, op, threshold)
+        self.kind = kind
+
+    @classmethod
+    def parse(cls, text):
+        """解析规则文本，格式错误时抛出 ValueError"""
+        kind, n, unit, plain, op, threshold = cls._match(text)
+        span = int(n) * cls.UNITS[unit] if kind else None
+        return cls(text.strip(), kind or plain, span, op, float(threshold))
+
+    def check(self, history):
+        """返回 (是否触发, 当前指标值)；历史不足时不触发"""
+        latest = history.latest
+        if not latest:
+            return False, None
+        if self.kind == 'price':
+            value = latest['price']
+        elif self.kind == 'day_change':
+            value = latest['day']['change']
+        else:
+            history.ensure_span(self.kind, self.span)
+            value = history.ma(self.span) if self.kind == 'ma' else history.change_pct(self.span)
+        if value is None:
+            return False, None
+        return self.fires(value), value
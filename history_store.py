@@ -0,0 +1,434 @@
+"""
+OmniMonitor 多分辨率历史存储
+- 基于 array 的定长环形缓冲区，内存占用在启动时即可确定
+- raw 层保存原始采样，1m / 1h 层保存 min / avg / max 汇总
+- 汇总在每次写入时增量更新，不回扫历史
+- 可选 mmap 持久化：每个层级在文件中是一个定长循环段，按间隔只写入新增记录
+"""
+
+import os
+import mmap
+import struct
+import threading
+from array import array
+
+# 层级名称 -> 汇总跨度 (秒)，raw 层不汇总
+TIERS = ('raw', '1m', '1h')
+TIER_SPANS = {'1m': 60, '1h': 3600}
+
+
+class _Ring:
+    """定长环形缓冲区：uint32 时间戳 + 若干 float32 数据列"""
+    __slots__ = ('capacity', 'ts', 'cols', 'head', 'size', 'dirty')
+
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.ts = array('I', bytes(4 * capacity))
+        self.cols = [array('f', bytes(4 * capacity)) for _ in range(columns)]
+        self.head = 0
+        self.size = 0
+        self.dirty = 0  # 上次持久化之后新写入的记录数
+
+    def append(self, ts, values):
+        i = self.head
+        self.ts[i] = int(ts)
+        for col, v in zip(self.cols, values):
+            col[i] = v
+        self.head = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        if self.dirty < self.capacity:
+            self.dirty += 1
+
+    def indexes(self):
+        """从旧到新的下标序列"""
+        start = (self.head - self.size) % self.capacity
+        return ((start + k) % self.capacity for k in range(self.size))
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in [self.ts, *self.cols])
+
+
+class _Rollup:
+    """按固定跨度增量汇总：当前桶在内存中累加，跨桶时落入环形缓冲区"""
+    __slots__ = ('span', 'ring', 'bucket', 'vmin', 'vmax', 'vsum', 'count')
+
+    def __init__(self, span, capacity):
+        self.span = span
+        self.ring = _Ring(capacity, 3)  # min / avg / max
+        self.bucket = -1
+        self.vmin = self.vmax = self.vsum = 0.0
+        self.count = 0
+
+    def add(self, ts, value):
+        b = int(ts) // self.span
+        if b != self.bucket:
+            self._flush()
+            self.bucket = b
+            self.vmin = self.vmax = self.vsum = value
+            self.count = 1
+            return
+        if value < self.vmin: self.vmin = value
+        if value > self.vmax: self.vmax = value
+        self.vsum += value
+        self.count += 1
+
+    def _flush(self):
+        if self.count:
+            self.ring.append(self.bucket * self.span, (self.vmin, self.vsum / self.count, self.vmax))
+
+    def pending(self):
+        """尚未落盘的当前桶 (ts, min, avg, max)，无数据时返回 None"""
+        if not self.count:
+            return None
+        return self.bucket * self.span, self.vmin, self.vsum / self.count, self.vmax
+
+
+class MetricHistory:
+    """单个指标的三层历史"""
+
+    def __init__(self, raw_points, minute_points, hour_points):
+        self.raw = _Ring(raw_points, 1)
+        self.rollups = {
+            '1m': _Rollup(TIER_SPANS['1m'], minute_points),
+            '1h': _Rollup(TIER_SPANS['1h'], hour_points),
+        }
+
+    def add(self, ts, value):
+        self.raw.append(ts, (value,))
+        for r in self.rollups.values():
+            r.add(ts, value)
+
+    def query(self, tier='raw', since=0, limit=None):
+        """
+        返回列式数据
+        raw: {'ts': [...], 'val': [...]}
+        1m / 1h: {'ts': [...], 'min': [...], 'avg': [...], 'max': [...]} (含进行中的当前桶)
+        limit: 最多返回最近的 limit 个点
+        """
+        out = self._query(tier, since)
+        if limit and len(out['ts']) > limit:
+            out = {k: v[-limit:] for k, v in out.items()}
+        return out
+
+    def _query(self, tier, since):
+        if tier == 'raw':
+            ring = self.raw
+            out = {'ts': [], 'val': []}
+            col = ring.cols[0]
+            for i in ring.indexes():
+                t = ring.ts[i]
+                if t >= since:
+                    out['ts'].append(t)
+                    out['val'].append(round(col[i], 2))
+            return out
+
+        rollup = self.rollups[tier]
+        ring = rollup.ring
+        out = {'ts': [], 'min': [], 'avg': [], 'max': []}
+        c_min, c_avg, c_max = ring.cols
+        for i in ring.indexes():
+            t = ring.ts[i]
+            if t >= since:
+                out['ts'].append(t)
+                out['min'].append(round(c_min[i], 2))
+                out['avg'].append(round(c_avg[i], 2))
+                out['max'].append(round(c_max[i], 2))
+        cur = rollup.pending()
+        if cur and cur[0] >= since:
+            for k, v in zip(('ts', 'min', 'avg', 'max'), cur):
+                out[k].append(v if k == 'ts' else round(v, 2))
+        return out
+
+    def nbytes(self):
+        return self.raw.nbytes() + sum(r.ring.nbytes() for r in self.rollups.values())
+
+
+class HistoryStore:
+    """
+    多指标历史存储
+    写入只来自采集线程，读取来自 Web / 调度线程，统一用一把锁保护
+    """
+
+    def __init__(self, keys, config=None):
+        cfg = config or {}
+        self.raw_points = int(cfg.get('raw_points', 720))        # 5s 采样约 1 小时
+        self.minute_points = int(cfg.get('minute_points', 2880))  # 2 天
+        self.hour_points = int(cfg.get('hour_points', 744))       # 31 天
+        # 指标数上限 (内存与持久化文件共用)，总内存 = 上限 × 单指标占用，启动时即可确定
+        self.max_series = max(1, int(cfg.get('max_series', 64)))
+        self._lock = threading.Lock()
+        self.series = {}
+        for k in keys:
+            self.add_metric(k)
+
+    def add_metric(self, key):
+        with self._lock:
+            if key not in self.series and len(self.series) < self.max_series:
+                self.series[key] = self.new_series()
+
+    def add(self, key, ts, value):
+        """写入一个点；新指标超出 max_series 时不创建，返回 False"""
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                if len(self.series) >= self.max_series:
+                    return False
+                series = self.series[key] = self.new_series()
+            series.add(ts, float(value))
+            return True
+
+    def remove(self, key):
+        """删除指标 (例如网卡已消失)，释放名额"""
+        with self._lock:
+            return self.series.pop(key, None) is not None
+
+    def last_ts(self, key):
+        """指标最近一个原始点的时间戳，无数据时返回 0"""
+        with self._lock:
+            series = self.series.get(key)
+            if series is None or not series.raw.size:
+                return 0
+            return series.raw.ts[(series.raw.head - 1) % series.raw.capacity]
+
+    def query(self, key, tier='raw', since=0, limit=None):
+        if tier not in TIERS:
+            raise ValueError(f"未知层级: {tier}")
+        with self._lock:
+            series = self.series.get(key)
+            return series.query(tier, since, limit) if series else None
+
+    def keys(self):
+        return list(self.series)
+
+    def new_series(self):
+        return MetricHistory(self.raw_points, self.minute_points, self.hour_points)
+
+    def nbytes(self):
+        """当前已分配的内存 (字节)"""
+        with self._lock:
+            return sum(s.nbytes() for s in self.series.values())
+
+    def budget_bytes(self):
+        """内存上限 (字节) = max_series × 单指标占用，不随运行时间或采集器数量增长"""
+        return self.max_series * 4 * (2 * self.raw_points + 4 * self.minute_points + 4 * self.hour_points)
+
+
+class HistoryFile:
+    """
+    历史数据的 mmap 持久化文件
+
+    布局: 文件头 | 指标名目录 | N 个定长槽位
+    目录项 = 2 字节名称长度 + 完整 UTF-8 名称 (不截断，超长的指标不持久化)
+    每个槽位 = 槽位头 (环形指针 + 汇总进行中的桶) + raw / 1m / 1h 三个循环段
+    每个循环段按列存放 (ts 列 + 数值列)，与内存中的 array 字节布局一致，
+    启动时直接按字节拷回内存，无需回放或解析文本。
+
+    写入只在 flush() 时发生，且只拷贝自上次 flush 以来新增的记录，
+    脏页数量与刷新间隔成正比，用于控制 eMMC 写入量。
+    """
+    MAGIC = b'OMTS'
+    VERSION = 2
+    HEADER = struct.Struct('<4sHHIIII')
+    HEADER_SIZE = 64
+    NAME_SIZE = 128
+    NAME_LEN = struct.Struct('<H')
+    # raw(head, size) + 2 × rollup(head, size, bucket, vmin, vmax, vsum, count)
+    SLOT_HDR = struct.Struct('<II' + 'IIqffdI' * 2)
+    SLOT_HDR_SIZE = 128
+
+    def __init__(self, path, store, logger=None):
+        self.path = path
+        self.store = store
+        self.max_series = store.max_series
+        self.logger = logger
+        self.slots = {}  # key -> slot index
+        self._refused = set()  # 名称过长或槽位已满而未持久化的指标 (只告警一次)
+        self._mm = None
+        self._fd = None
+
+        # 每个层级的 (容量, 列数)，顺序即文件中的段顺序
+        self.layout = [
+            (store.raw_points, 1),
+            (store.minute_points, 3),
+            (store.hour_points, 3),
+        ]
+        self.slot_size = self.SLOT_HDR_SIZE + sum(cap * 4 * (cols + 1) for cap, cols in self.layout)
+        self.dir_offset = self.HEADER_SIZE
+        self.data_offset = self.dir_offset + self.NAME_SIZE * self.max_series
+        self.file_size = self.data_offset + self.slot_size * self.max_series
+
+    def _log(self, level, msg):
+        if self.logger: getattr(self.logger, level)(msg)
+
+    def _header_bytes(self):
+        return self.HEADER.pack(self.MAGIC, self.VERSION, 0, self.store.raw_points,
+                                self.store.minute_points, self.store.hour_points, self.max_series)
+
+    # ═══════════════════════════════════════
+    #  打开 / 恢复
+    # ═══════════════════════════════════════
+
+    def open(self):
+        """打开 (必要时预分配) 文件并恢复历史，返回恢复的指标数"""
+        d = os.path.dirname(self.path)
+        if d: os.makedirs(d, exist_ok=True)
+
+        fresh = True
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb') as f:
+                header = f.read(self.HEADER.size)
+            if not header.startswith(self.MAGIC):
+                # 不是历史文件 (路径配置错误)：移到一旁保留，绝不截断
+                backup = self.path + '.bak'
+                os.replace(self.path, backup)
+                self._log('warning', f"{self.path} 不是历史文件，已移至 {backup}")
+            elif os.path.getsize(self.path) == self.file_size and header == self._header_bytes():
+                fresh = False
+            else:
+                self._log('warning', "历史文件格式或容量已变化，重新创建")
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fresh:
+            # 一次性预分配，运行期间文件大小不再变化
+            os.ftruncate(self._fd, 0)
+            os.ftruncate(self._fd, self.file_size)
+        self._mm = mmap.mmap(self._fd, self.file_size)
+        if fresh:
+            self._mm[0:self.HEADER.size] = self._header_bytes()
+            self._mm.flush()
+            return 0
+        return self._restore()
+
+    def _restore(self):
+        mm = self._mm
+        restored = 0
+        with self.store._lock:
+            for idx in range(self.max_series):
+                off = self.dir_offset + idx * self.NAME_SIZE
+                (n,) = self.NAME_LEN.unpack_from(mm, off)
+                if not n:
+                    continue
+                try:
+                    if n > self.NAME_SIZE - self.NAME_LEN.size:
+                        raise ValueError(f"名称长度 {n} 超出目录项")
+                    key = mm[off + self.NAME_LEN.size:off + self.NAME_LEN.size + n].decode('utf-8')
+                    if key in self.slots:
+                        raise ValueError(f"与槽位 {self.slots[key]} 重名")
+                    if key not in self.store.series and len(self.store.series) >= self.max_series:
+                        raise ValueError("超出 max_series")
+                except ValueError as e:
+                    # 目录项损坏或重名：丢弃该槽位，避免两个槽位对应同一指标、刷盘时互相覆盖
+                    self._log('warning', f"历史文件槽位 {idx} 已丢弃: {e}")
+                    self._clear_dir(idx)
+                    continue
+                series = self.store.new_series()
+                self._load_slot(idx, series)
+                self.store.series[key] = series
+                self.slots[key] = idx
+                restored += 1
+        return restored
+
+    def _segments(self, idx, series):
+        """遍历槽位内各循环段: (ring, 段起始偏移)"""
+        off = self.data_offset + idx * self.slot_size + self.SLOT_HDR_SIZE
+        rings = [series.raw, series.rollups['1m'].ring, series.rollups['1h'].ring]
+        for ring, (cap, cols) in zip(rings, self.layout):
+            yield ring, off
+            off += cap * 4 * (cols + 1)
+
+    def _load_slot(self, idx, series):
+        mm = self._mm
+        for ring, off in self._segments(idx, series):
+            n = ring.capacity * 4
+            for k, arr in enumerate([ring.ts, *ring.cols]):
+                del arr[:]
+                arr.frombytes(mm[off + k * n:off + (k + 1) * n])
+            ring.dirty = 0
+
+        hdr_off = self.data_offset + idx * self.slot_size
+        vals = self.SLOT_HDR.unpack_from(mm, hdr_off)
+        series.raw.head, series.raw.size = vals[0], vals[1]
+        for i, name in enumerate(('1m', '1h')):
+            r = series.rollups[name]
+            (r.ring.head, r.ring.size, r.bucket, r.vmin, r.vmax, r.vsum, r.count) = vals[2 + i * 7:9 + i * 7]
+
+    # ═══════════════════════════════════════
+    #  增量写入
+    # ═══════════════════════════════════════
+
+    def _slot_for(self, key):
+        idx = self.slots.get(key)
+        if idx is not None or key in self._refused:
+            return idx
+        name = key.encode('utf-8')
+        used = set(self.slots.values())
+        idx = next((i for i in range(self.max_series) if i not in used), None)
+        if idx is None or len(name) > self.NAME_SIZE - self.NAME_LEN.size:
+            reason = "槽位已满" if idx is None else "名称过长"
+            self._log('warning', f"指标 {key} 不持久化 ({reason})")
+            self._refused.add(key)
+            return None
+        off = self.dir_offset + idx * self.NAME_SIZE
+        self._mm[off:off + self.NAME_SIZE] = (self.NAME_LEN.pack(len(name)) + name).ljust(self.NAME_SIZE, b'\0')
+        self.slots[key] = idx
+        return idx
+
+    def release(self, key):
+        """指标已从内存中删除：清除目录项，槽位留给新指标"""
+        if self._mm is None:
+            return
+        with self.store._lock:
+            idx = self.slots.pop(key, None)
+            self._refused.discard(key)
+            if idx is not None:
+                self._clear_dir(idx)
+
+    def _clear_dir(self, idx):
+        off = self.dir_offset + idx * self.NAME_SIZE
+        self._mm[off:off + self.NAME_SIZE] = bytes(self.NAME_SIZE)
+
+    def _write_ring(self, ring, off):
+        """只把 dirty 的记录写入映射区 (跨越环尾时拆成两段)"""
+        dirty = ring.dirty
+        if not dirty:
+            return
+        n = ring.capacity * 4
+        start = (ring.head - dirty) % ring.capacity
+        if start + dirty <= ring.capacity:
+            spans = [(start, start + dirty)]
+        else:
+            spans = [(start, ring.capacity), (0, ring.head)]
+        for k, arr in enumerate([ring.ts, *ring.cols]):
+            base = off + k * n
+            for a, b in spans:
+                self._mm[base + a * 4:base + b * 4] = arr[a:b].tobytes()
+        ring.dirty = 0
+
+    def flush(self):
+        """将新增记录拷入映射区并同步到磁盘"""
+        if self._mm is None:
+            return
+        with self.store._lock:
+            for key, series in self.store.series.items():
+                idx = self._slot_for(key)
+                if idx is None:
+                    continue
+                for ring, off in self._segments(idx, series):
+                    self._write_ring(ring, off)
+                hdr = [series.raw.head, series.raw.size]
+                for name in ('1m', '1h'):
+                    r = series.rollups[name]
+                    hdr += [r.ring.head, r.ring.size, r.bucket, r.vmin, r.vmax, r.vsum, r.count]
+                self.SLOT_HDR.pack_into(self._mm, self.data_offset + idx * self.slot_size, *hdr)
+        self._mm.flush()
+
+    def close(self):
+        if self._mm is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._mm.close()
+            os.close(self._fd)
+            self._mm = None
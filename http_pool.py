@@ -0,0 +1,204 @@
+"""
+OmniMonitor HTTP 长连接池
+- 每个 (scheme, host, port) 维护一组常驻 HTTPConnection / HTTPSConnection，复用 TCP 与 TLS 会话
+- 连接空闲超过 idle_timeout 后丢弃；每个主机最多保留 max_per_host 个空闲连接
+- 复用的连接若已被服务端关闭 (对端断开 / 管道破裂)，透明地新建连接重发一次
+- 自动解压 gzip / deflate 响应，跟随有限次数的重定向
+"""
+
+import ssl
+import gzip
+import zlib
+import time
+import threading
+import http.client
+from collections import deque
+from urllib.parse import urlsplit, urljoin
+
+# 复用连接上出现这些错误说明连接已失效，换新连接重发一次
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                 ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+def safe_url(url):
+    """日志与异常中使用的 URL：只保留 scheme / host / path，查询串中可能带有 API Key 或坐标"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}" if parts.netloc else parts.path
+
+
+class HttpStatusError(OSError):
+    """HTTP 状态码 >= 400 (作为网络类错误处理，调用方可按需重试)"""
+
+    def __init__(self, status, reason, url):
+        super().__init__(f"HTTP {status} {reason}: {safe_url(url)[:80]}")
+        self.status = status
+
+
+class HttpResponse:
+    """已读取完毕的响应 (body 已解压)"""
+    __slots__ = ('status', 'reason', 'headers', 'body', 'url')
+
+    def __init__(self, status, reason, headers, body, url):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.url = url
+
+    def header(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+    def text(self, errors='strict'):
+        return self.body.decode('utf-8', errors=errors)
+
+
+class HttpPool:
+    """按主机分组的连接池 (线程安全：连接借出期间只属于一个线程)"""
+
+    def __init__(self, config=None, logger=None):
+        cfg = config or {}
+        self.logger = logger
+        self.max_per_host = max(1, int(cfg.get('max_per_host', 2)))
+        self.idle_timeout = cfg.get('idle_timeout', 60)
+        self.timeout = cfg.get('timeout', 10)
+        self.max_redirects = cfg.get('max_redirects', 3)
+        self._ssl_ctx = ssl.create_default_context()
+        self._lock = threading.Lock()
+        self._idle = {}     # (scheme, host, port) -> deque[(conn, 归还时间)]
+        self.stats = {'requests': 0, 'connects': 0, 'reused': 0, 'stale_retries': 0}
+
+    # ═══════════════════════════════════════
+    #  连接借还
+    # ═══════════════════════════════════════
+
+    def _new_conn(self, key, timeout):
+        scheme, host, port = key
+        with self._lock:
+            self.stats['connects'] += 1
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_ctx)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _checkout(self, key, timeout):
+        """取一个空闲连接 (最近归还的优先)，没有则新建；返回 (conn, 是否复用)"""
+        now = time.monotonic()
+        expired = []
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                c, ts = idle.pop()
+                if now - ts <= self.idle_timeout:
+                    conn = c
+                    break
+                expired.append(c)
+            # 栈底的连接更旧，一并检查过期
+            while idle and now - idle[0][1] > self.idle_timeout:
+                expired.append(idle.popleft()[0])
+            if conn is not None:
+                self.stats['reused'] += 1
+        for c in expired:
+            c.close()
+        if conn is None:
+            return self._new_conn(key, timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self.max_per_host:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close(self):
+        """关闭全部空闲连接"""
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for c, _ in idle:
+                c.close()
+
+    def idle_counts(self):
+        with self._lock:
+            return {f"{h}:{p}": len(q) for (_, h, p), q in self._idle.items()}
+
+    # ═══════════════════════════════════════
+    #  请求
+    # ═══════════════════════════════════════
+
+    @staticmethod
+    def _decode(body, encoding):
+        encoding = (encoding or '').lower()
+        if encoding == 'gzip':
+            return gzip.decompress(body)
+        if encoding == 'deflate':
+            try:
+                return zlib.decompress(body)
+            except zlib.error:
+                return zlib.decompress(body, -zlib.MAX_WBITS)  # 原始 deflate 流
+        return body
+
+    def _send(self, key, method, path, body, headers, timeout):
+        """在一个连接上完成一次请求，复用连接失效时换新连接重发一次"""
+        conn, reused = self._checkout(key, timeout)
+        try:
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                res = conn.getresponse()
+            except _STALE_ERRORS:
+                if not reused:
+                    raise
+                conn.close()
+                with self._lock:
+                    self.stats['stale_retries'] += 1
+                conn = self._new_conn(key, timeout)
+                conn.request(method, path, body=body, headers=headers)
+                res = conn.getresponse()
+            data = res.read()
+        except BaseException:
+            conn.close()
+            raise
+
+        if res.will_close:
+            conn.close()
+        else:
+            self._checkin(key, conn)
+        resp_headers = {k.lower(): v for k, v in res.getheaders()}
+        return res.status, res.reason, resp_headers, data
+
+    def request(self, url, method='GET', headers=None, body=None, timeout=None, raise_for_status=True):
+        """
+        发送请求并读取完整响应
+        :return: HttpResponse；网络错误抛出 OSError / http.client.HTTPException，
+                 raise_for_status 为真时状态码 >= 400 抛出 HttpStatusError
+        """
+        timeout = timeout or self.timeout
+        headers = dict(headers or {})
+        for _ in range(self.max_redirects + 1):
+            parts = urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in ('http', 'https'):
+                raise ValueError(f"不支持的协议: {safe_url(url)[:80]}")
+            port = parts.port or (443 if scheme == 'https' else 80)
+            key = (scheme, parts.hostname, port)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            with self._lock:
+                self.stats['requests'] += 1
+
+            status, reason, resp_headers, data = self._send(key, method, path, body, headers, timeout)
+            if status in (301, 302, 303, 307, 308) and 'location' in resp_headers:
+                url = urljoin(url, resp_headers['location'])
+                if status == 303:
+                    method, body = 'GET', None
+                continue
+            if raise_for_status and status >= 400:
+                raise HttpStatusError(status, reason, url)
+            data = self._decode(data, resp_headers.get('content-encoding'))
+            return HttpResponse(status, reason, resp_headers, data, url)
+        raise HttpStatusError(310, 'Too many redirects', url)
@@ -0,0 +1,150 @@
+"""
+OmniMonitor 自身开销统计
+- 每个埋点记录调用次数、错误次数、墙钟时间 / CPU 时间累计与最大值
+- 延迟分布使用固定分桶直方图 (内存固定，O(1) 记录)，分位数取所在桶上界
+- 全局实例 METRICS 由采集器、数据抓取、推送与调度循环共用
+"""
+
+import os
+import time
+import functools
+import resource
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# 延迟分桶上界 (毫秒)，最后一个桶收纳所有更慢的调用
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+    """单个埋点的计数器与固定分桶直方图"""
+    __slots__ = ('count', 'errors', 'wall', 'cpu', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.wall = 0.0      # 秒
+        self.cpu = 0.0       # 秒 (调用线程的 CPU 时间)
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def record(self, wall, cpu, error=False):
+        ms = wall * 1000
+        self.count += 1
+        self.wall += wall
+        self.cpu += cpu
+        if error: self.errors += 1
+        if ms > self.max_ms: self.max_ms = ms
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, pct):
+        """近似分位数 (毫秒)，落在最后一个桶时返回最大值"""
+        if not self.count:
+            return None
+        rank = self.count * pct / 100.0
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def to_dict(self):
+        n = self.count or 1
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'wall_total_s': round(self.wall, 3),
+            'cpu_total_s': round(self.cpu, 3),
+            'avg_ms': round(self.wall * 1000 / n, 2),
+            'cpu_avg_ms': round(self.cpu * 1000 / n, 2),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'max_ms': round(self.max_ms, 1),
+            'buckets': self.buckets[:],
+        }
+
+
+class Instrumentation:
+    """埋点注册表 (多线程写入，一把锁保护)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hists = {}
+        self.started = time.time()
+        self._cpu_start = time.process_time()
+
+    def record(self, name, wall, cpu, error=False):
+        with self._lock:
+            h = self._hists.get(name)
+            if h is None:
+                h = self._hists[name] = LatencyHistogram()
+            h.record(wall, cpu, error)
+
+    @contextmanager
+    def timer(self, name):
+        """计时上下文：with METRICS.timer('fetch.x'): ...，块内抛出异常计为错误并继续抛出"""
+        w0, c0 = time.perf_counter(), time.thread_time()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - w0, time.thread_time() - c0, error)
+
+    def timed(self, name):
+        """函数装饰器版本的 timer"""
+        def deco(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def process(self):
+        """进程整体开销：运行时长、累计 CPU、平均 CPU 占用、峰值 / 当前常驻内存"""
+        uptime = max(1e-6, time.time() - self.started)
+        cpu = time.process_time() - self._cpu_start
+        out = {
+            'uptime_s': round(uptime),
+            'cpu_total_s': round(cpu, 2),
+            'cpu_pct': round(100 * cpu / uptime, 2),
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'threads': threading.active_count(),
+        }
+        try:
+            with open('/proc/self/statm', 'rb') as f:
+                out['rss_mb'] = round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576, 1)
+        except (OSError, ValueError, IndexError):
+            pass
+        return out
+
+    def snapshot(self):
+        """全部埋点的 JSON 结构，供管理员 API 使用"""
+        with self._lock:
+            ops = {name: h.to_dict() for name, h in sorted(self._hists.items())}
+        return {'buckets_ms': list(BUCKETS_MS), 'process': self.process(), 'ops': ops}
+
+    def top(self, prefix='', n=3, exclude=('scheduler.',)):
+        """
+        按累计墙钟时间排序的前 n 个埋点: [(名称, 累计秒, 占比, 平均毫秒)]
+        默认排除调度循环本身 (它包含了其他埋点的耗时)，占比按筛选后的总耗时计算
+        """
+        with self._lock:
+            items = [(name, h.wall, h.count) for name, h in self._hists.items()
+                     if name.startswith(prefix) and not name.startswith(exclude)]
+        total = sum(w for _, w, _ in items) or 1
+        items.sort(key=lambda x: x[1], reverse=True)
+        return [(name, round(w, 2), round(w / total, 3), round(w * 1000 / (c or 1), 1)) for name, w, c in items[:n]]
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear()
+
+
+# 进程内共享的埋点实例
+METRICS = Instrumentation()
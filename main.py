@@ -1,4 +1,6 @@
 import os
+import signal
+import threading
 from config_manager import ConfigManager
 from logger_manager import LoggerManager
 from push_client import PushPlusClient
@@ -7,12 +9,22 @@ from monitor import SystemMonitor
 from web_service import WebService
 from scheduler import TaskScheduler
 from auth import AuthManager
+from gold_tracker import GoldHistory
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_PATH = os.path.join(BASE_DIR, 'config.json')
 CACHE_FILE = os.path.join(BASE_DIR, '.push_cache_v2')
 
+# SIGTERM 只置位该事件，调度器在当前一轮结束后退出并执行清理 (冲刷日志 / 历史落盘)，
+# 不在任意位置抛出异常打断正在进行的文件写入
+STOP_EVENT = threading.Event()
+
+def _handle_sigterm(signum, frame):
+    STOP_EVENT.set()
+
 def main():
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
     # 1. 启动日志
     temp_cfg = {}
     try:
@@ -34,7 +46,14 @@ def main():
     # 3. 初始化服务组件
     pusher = PushPlusClient(config_mgr.data.get('pushplus_users', []), logger)
     fetcher = DataFetcher(config_mgr.data, logger)
-    monitor = SystemMonitor(logger)
+    monitor = SystemMonitor(logger, config_mgr.data.get('monitor', {}))
+    monitor.start()
+
+    # 3.5 金价历史 (调度线程写入，Web 读取)
+    gold_history = GoldHistory(config_mgr.data.get('active_alert', {}).get('gold', {}).get('history', {}), logger)
+    restored = gold_history.open()
+    if restored:
+        logger.info(f"💰 金价历史已加载: {restored} 个点")
 
     # 4. 启动 Web 配置台 (带认证)
     web_server = WebService(
@@ -43,6 +62,7 @@ def main():
         fetcher=fetcher, 
         monitor=monitor,
         auth_mgr=auth_mgr,
+        gold_history=gold_history,
         port=8888
     )
     web_server.start()
@@ -55,7 +75,9 @@ def main():
         fetcher=fetcher,
         monitor=monitor,
         cache_file=CACHE_FILE,
-        auth_mgr=auth_mgr
+        auth_mgr=auth_mgr,
+        gold_history=gold_history,
+        stop_event=STOP_EVENT
     )
     
     scheduler.start()
@@ -1,113 +1,414 @@
 import os
+import json
 import time
-import re
-from collections import deque
+import fnmatch
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+from history_store import HistoryStore, HistoryFile
+from window_agg import WindowAggregator
+from anomaly import AnomalyDetector
+from collectors import COLLECTOR_TYPES, create_collector
+from instrument import METRICS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 旧版指标名 -> 历史序列名 (兼容 get_history() 的 cpu / mem / disk)
+LEGACY_HISTORY_KEYS = {'cpu_temp': 'cpu', 'mem_usage': 'mem', 'disk_usage': 'disk'}
+
+# 默认记录历史的指标 (fnmatch 模式)；每核 / 每网卡等数量随硬件变化的指标需在 history.metrics 中显式加入
+DEFAULT_HISTORY_METRICS = (
+    'cpu', 'mem', 'disk', 'cpu_usage', 'cpu_iowait', 'mem_now', 'load1',
+    'net_rx_bps', 'net_tx_bps', 'disk_*_usage', 'temp_*', 'psi_*_some',
+)
+
+# 启动即创建、不会过期清理的历史序列
+PINNED_HISTORY_KEYS = ('cpu', 'mem', 'disk')
+
+# 未在 monitor.collectors 中出现时也默认启用的内置采集器
+BUILTIN_COLLECTORS = ('thermal', 'memory', 'cpu', 'pressure', 'net', 'disk', 'procs')
+
+# 自定义脚本采集器的定义文件 (固定路径，不在 config.json 中，Web 端无法修改)
+SCRIPTS_FILE = os.path.join(BASE_DIR, 'scripts.json')
+
+
+def load_script_collectors(path=SCRIPTS_FILE, logger=None):
+    """读取本地脚本采集器定义 {名称: {command: [argv...], interval, timeout, prefix}}，文件不存在时返回空"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    except Exception as e:
+        if logger: logger.error(f"脚本采集器文件读取失败: {e}")
+        return {}
+    return {name: {**(opts or {}), 'type': 'script'} for name, opts in entries.items()}
+
+
+def is_script_entry(name, opts):
+    """采集器条目是否为脚本类型 (未写 type 时按名称判断)"""
+    type_name = opts.get('type', name) if isinstance(opts, dict) else name
+    return type_name == 'script'
+
+
+class MetricsSnapshot(namedtuple('MetricsSnapshot', ['version', 'ts', 'values'])):
+    """
+    不可变指标快照
+    采集线程每个 tick 生成一个新对象并整体替换引用，
+    Web / 调度器只读引用，无需加锁，也不会触发任何文件 I/O
+    """
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def to_dict(self):
+        return {'version': self.version, 'ts': self.ts, **self.values}
+
+
+class _CollectorSlot:
+    """采样引擎中的一个采集器实例及其节拍状态"""
+    __slots__ = ('name', 'type', 'collector', 'options', 'interval', 'next_due', 'last_run')
+
+    def __init__(self, name, type_name, collector, options, interval, next_due):
+        self.name = name
+        self.type = type_name
+        self.collector = collector
+        self.options = options
+        self.interval = interval
+        self.next_due = next_due
+        self.last_run = 0
+
 
 class SystemMonitor:
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, config=None):
         self.logger = logger
-        self.hisilicon_pattern = re.compile(r'temperature\s*=\s*(\d+)')
-        
-        # 内存采样 (用于计算5分钟平均值)
-        self.mem_samples = []
-        
-        # 历史趋势数据 (保留最近60个点，约1小时数据)
-        self.history = {
-            'cpu': deque(maxlen=60),
-            'mem': deque(maxlen=60),
-            'disk': deque(maxlen=60)
-        }
+        self.cfg = config or {}
+
+        # 采集器实例: 名称 -> _CollectorSlot (整体替换，读者无需加锁)
+        self.slots = {}
+        self._latest = {}           # 名称 -> 该采集器最近一次输出
+        self._pending_cfg = None    # 热重载待应用的配置 (由采集线程应用)
+        self._configure(self.cfg.get('collectors', {}))
+
+        # 流式窗口聚合 (1m / 5m / 15m)，供窗口告警规则使用
+        self.windows = WindowAggregator()
+
+        # 流式异常检测 (EWMA 偏离 / 变化率 / 磁盘占满时间)
+        self.anomaly = AnomalyDetector(self.cfg.get('anomaly', {}))
+
+        # 历史趋势数据 (raw / 1m / 1h 三层环形缓冲，序列数上限与持久化文件共用)
+        history_cfg = dict(self.cfg.get('history', {}))
+        persist_cfg = self.cfg.get('persist', {})
+        history_cfg.setdefault('max_series', persist_cfg.get('max_series', 64))
+        self.history = HistoryStore(PINNED_HISTORY_KEYS, history_cfg)
+        self.history_metrics = tuple(history_cfg.get('metrics', DEFAULT_HISTORY_METRICS))
+        self.history_expire = int(history_cfg.get('expire_after', 3600))  # 超过该时长无新数据的序列被删除
+        self._history_refused = set()   # 因超出 max_series 未记录的指标 (只告警一次)
+
+        self._snapshot = MetricsSnapshot(0, 0, MappingProxyType({
+            'cpu_temp': 0, 'disk_usage': 0, 'mem_usage': 0
+        }))
+        # 历史持久化 (mmap 定长文件，按间隔增量刷盘，思路同日志的 flash_protection)
+        self.history_file = None
+        self.flush_interval = max(10, int(persist_cfg.get('flush_interval', 300)))
+        if persist_cfg.get('enable', True):
+            path = persist_cfg.get('path', '.history.omts')
+            if not os.path.isabs(path):
+                path = os.path.join(BASE_DIR, path)
+            self.history_file = HistoryFile(path, self.history, logger)
+
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+        self.log(f"📦 历史存储上限 {self.history.budget_bytes() // 1024} KB ({self.history.max_series} 个指标)")
 
     def log(self, msg):
         if self.logger: self.logger.info(msg)
 
-    def _record_history(self, key, value):
-        """记录历史数据用于前端绘图"""
-        if value is not None:
-            self.history[key].append(value)
+    # ═══════════════════════════════════════
+    #  采集器注册与配置
+    # ═══════════════════════════════════════
+
+    def _configure(self, collectors_cfg):
+        """
+        按 monitor.collectors 配置创建 / 复用 / 关闭采集器
+        选项未变化的采集器保留实例 (差分基线不丢失)，只更新周期
+        """
+        entries = {name: {} for name in BUILTIN_COLLECTORS}
+        for name, opts in (collectors_cfg or {}).items():
+            if is_script_entry(name, opts):
+                # 脚本采集器会在主机上执行命令，只接受本地 scripts.json 中的定义
+                if self.logger: self.logger.warning(f"忽略 config.json 中的脚本采集器 {name}，请在 scripts.json 中定义")
+                continue
+            entries[name] = opts
+        entries.update(load_script_collectors(logger=self.logger))
+        now = time.monotonic()
+
+        slots = {}
+        for name, opts in entries.items():
+            opts = opts or {}
+            if not opts.get('enable', True):
+                continue
+            type_name = opts.get('type', name)
+            cls = COLLECTOR_TYPES.get(type_name)
+            if cls is None:
+                if self.logger: self.logger.warning(f"未知采集器类型: {name} ({type_name})")
+                continue
+            interval = max(1, int(opts.get('interval', cls.default_interval)))
+            options = {k: v for k, v in opts.items() if k not in ('enable', 'interval')}
+
+            slot = self.slots.get(name)
+            if slot and slot.type == type_name and slot.options == options:
+                if interval != slot.interval:
+                    slot.interval = interval
+                    slot.next_due = min(slot.next_due, now + interval)
+                slots[name] = slot
+                continue
+            if slot:
+                slot.collector.close()
+            try:
+                collector = create_collector(type_name, {'name': name, **options})
+            except Exception as e:
+                if self.logger: self.logger.error(f"采集器 {name} 初始化失败: {e}")
+                continue
+            slots[name] = _CollectorSlot(name, type_name, collector, options, interval, now)
+
+        for name, slot in self.slots.items():
+            if name not in slots:
+                slot.collector.close()
+                self._latest.pop(name, None)
+        self.slots = slots
+
+    def apply_config(self, config):
+        """热重载：由调度线程调用，实际切换在采集线程的下一次唤醒时完成"""
+        self._pending_cfg = config or {}
+        self._wake.set()
+
+    def get_collectors(self):
+        """采集器清单 (名称、类型、周期、输出 schema)"""
+        now = time.monotonic()
+        return [{
+            'name': s.name,
+            'type': s.type,
+            'interval': s.interval,
+            'next_in': round(max(0, s.next_due - now), 1),
+            'schema': getattr(s.collector, 'schema', {}),
+        } for s in self.slots.values()]
+
+    # ═══════════════════════════════════════
+    #  采样引擎
+    # ═══════════════════════════════════════
+
+    def start(self):
+        """先同步采集一次，保证快照可用，再启动后台采集线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        if self.history_file:
+            try:
+                restored = self.history_file.open()
+                self.log(f"💾 历史文件已加载: {restored} 个指标 ({self.history_file.file_size // 1024} KB)")
+            except Exception as e:
+                if self.logger: self.logger.error(f"历史文件打开失败，仅保留内存历史: {e}")
+                self.history_file = None
+        self.collect()
+        now = time.monotonic()
+        for s in self.slots.values():
+            s.next_due = now + s.interval
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="MetricsCollector", daemon=True)
+        self._thread.start()
+        desc = ", ".join(f"{s.name}/{s.interval}s" for s in self.slots.values())
+        self.log(f"📈 指标采集线程已启动 ({desc})")
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        for slot in self.slots.values():
+            slot.collector.close()
+        if self.history_file:
+            try:
+                self.history_file.close()
+            except Exception as e:
+                if self.logger: self.logger.error(f"历史文件关闭失败: {e}")
+
+    def flush_history(self):
+        """将内存中新增的历史记录写入持久化文件"""
+        if self.history_file:
+            try:
+                self.history_file.flush()
+            except Exception as e:
+                if self.logger: self.logger.error(f"历史文件刷盘失败: {e}")
+
+    def _run(self):
+        """
+        按截止时间驱动：每次唤醒只运行到期的采集器，同周期的采集器合并在一次唤醒中，
+        下一次唤醒时间取所有采集器中最早的截止时间
+        """
+        last_flush = time.monotonic()
+        while not self._stop_event.is_set():
+            if self._pending_cfg is not None:
+                cfg, self._pending_cfg = self._pending_cfg, None
+                self._configure(cfg.get('collectors', {}))
+                self.anomaly.configure(cfg.get('anomaly', {}))
+                self.log("♻️ 采集器配置已重载")
+
+            now = time.monotonic()
+            due = [s for s in self.slots.values() if s.next_due <= now]
+            if due:
+                try:
+                    self.collect(due)
+                except Exception as e:
+                    if self.logger: self.logger.error(f"指标采集异常: {e}")
+                for s in due:
+                    s.next_due += s.interval
+                    # 落后超过一个周期 (例如系统挂起) 时直接对齐到当前时间，不补采
+                    if s.next_due <= now:
+                        s.next_due = now + s.interval
+
+            if now - last_flush >= self.flush_interval:
+                self.expire_history()
+                self.flush_history()
+                last_flush = now
+
+            next_due = min((s.next_due for s in self.slots.values()), default=now + 60)
+            self._wake.wait(max(0, next_due - time.monotonic()))
+            self._wake.clear()
+
+    def collect(self, slots=None):
+        """
+        运行指定采集器 (默认全部)，写入窗口与历史并发布新快照 (仅由采集线程调用)
+        快照由所有采集器最近一次的输出合并而成，每个采集器按自己的周期产生一个历史点
+        """
+        if slots is None:
+            slots = list(self.slots.values())
+        now = time.time()
+        fresh = {}
+        for slot in slots:
+            try:
+                with METRICS.timer(f"collector.{slot.name}"):
+                    out = slot.collector.collect()
+            except Exception as e:
+                if self.logger: self.logger.error(f"采集器 {slot.name} 出错: {e}")
+                continue
+            slot.last_run = now
+            self._latest[slot.name] = out
+            fresh.update(out)
+            for key in getattr(slot.collector, 'removed_keys', ()):
+                self.forget_metric(key)
+
+        for key, val in fresh.items():
+            if isinstance(val, (int, float)):
+                self.windows.add(key, now, val)
+                self.anomaly.update(key, now, val)
+                self._record_history(LEGACY_HISTORY_KEYS.get(key, key), now, val)
+
+        values = {'cpu_temp': 0, 'disk_usage': 0, 'mem_usage': 0}
+        for name in self.slots:
+            values.update(self._latest.get(name, {}))
+        values['anomalies'] = self.anomaly.active_events(now)
+        snap = MetricsSnapshot(self._snapshot.version + 1, now, MappingProxyType(values))
+        self._snapshot = snap
+        return snap
+
+    @property
+    def snapshot(self):
+        """最新快照 (只读引用)"""
+        return self._snapshot
+
+    def _record_history(self, key, ts, value):
+        """记录历史数据用于前端绘图 (仅 history.metrics 中的指标)"""
+        if value is None or not any(fnmatch.fnmatchcase(key, p) for p in self.history_metrics):
+            return
+        if not self.history.add(key, ts, value) and key not in self._history_refused:
+            self._history_refused.add(key)
+            if self.logger:
+                self.logger.warning(f"指标 {key} 不记录历史: 已达 max_series={self.history.max_series}")
+
+    def drop_history(self, key):
+        """删除一个历史序列并释放其文件槽位"""
+        if self.history.remove(key):
+            if self.history_file:
+                self.history_file.release(key)
+            self._history_refused.clear()   # 有空位后允许之前被拒绝的指标重新尝试
+            return True
+        return False
+
+    def forget_metric(self, key):
+        """指标来源已消失 (例如网卡被移除)：删除其窗口、异常检测状态与历史序列"""
+        self.windows.remove(key)
+        self.anomaly.forget(key)
+        if self.drop_history(key):
+            self.log(f"🧹 指标 {key} 已消失，历史序列已删除")
+
+    def expire_history(self, now=None):
+        """删除超过 expire_after 没有新数据的序列 (例如已拔出的磁盘 / 已消失的传感器)"""
+        if self.history_expire <= 0:
+            return []
+        now = now or time.time()
+        stale = [k for k in self.history.keys()
+                 if k not in PINNED_HISTORY_KEYS and now - self.history.last_ts(k) > self.history_expire]
+        for k in stale:
+            # 同时删除窗口与异常检测状态，避免已消失指标的事件一直保持活跃
+            self.forget_metric(k)
+        return stale
+
+    # ═══════════════════════════════════════
+    #  对外读取接口 (只读快照)
+    # ═══════════════════════════════════════
 
     def get_cpu_temp(self):
-        """获取CPU温度并记录历史"""
-        temp = 0
-        try:
-            # 1. 海思芯片
-            hisilicon_path = "/proc/msp/pm_cpu"
-            if os.path.exists(hisilicon_path):
-                with open(hisilicon_path, "r") as f:
-                    match = self.hisilicon_pattern.search(f.read())
-                    if match: temp = float(match.group(1))
-            else:
-                # 2. 常规 Linux
-                paths = [
-                    "/sys/class/thermal/thermal_zone0/temp",
-                    "/sys/class/hwmon/hwmon0/temp1_input"
-                ]
-                for p in paths:
-                    if os.path.exists(p):
-                        with open(p, "r") as f:
-                            val = int(f.read().strip())
-                            temp = val / 1000.0 if val > 200 else float(val)
-                            break
-        except Exception as e:
-            if self.logger: self.logger.error(f"温度读取出错: {e}")
-        
-        self._record_history('cpu', temp)
-        return temp
+        """获取CPU温度 (来自最新快照)"""
+        return self._snapshot.get('cpu_temp', 0)
 
     def get_disk_usage(self):
-        """获取磁盘占用并记录历史"""
-        usage = 0
-        try:
-            st = os.statvfs('/')
-            total = st.f_blocks * st.f_frsize
-            if total > 0:
-                usage = round(100 * (total - st.f_bfree * st.f_frsize) / total, 1)
-        except: pass
-        
-        self._record_history('disk', usage)
-        return usage
+        """获取磁盘占用 (来自最新快照)"""
+        return self._snapshot.get('disk_usage', 0)
 
     def get_memory_usage(self):
-        """获取内存(5分钟平均)并记录历史"""
-        current_usage = 0
-        try:
-            if os.path.exists("/proc/meminfo"):
-                mem_info = {}
-                with open("/proc/meminfo", "r") as f:
-                    for line in f:
-                        parts = line.split(':')
-                        if len(parts) == 2:
-                            mem_info[parts[0].strip()] = int(parts[1].split()[0])
-                        if 'MemTotal' in mem_info and 'MemAvailable' in mem_info:
-                            break
-                
-                total = mem_info.get('MemTotal', 0)
-                avail = mem_info.get('MemAvailable', 0)
-                if total > 0:
-                    current_usage = 100 * (total - avail) / total
-
-            # 滑动平均逻辑
-            now = time.time()
-            self.mem_samples.append((now, current_usage))
-            cutoff = now - 300
-            self.mem_samples = [(t, v) for t, v in self.mem_samples if t > cutoff]
-            
-            avg_val = 0
-            if self.mem_samples:
-                avg_val = sum(v for t, v in self.mem_samples) / len(self.mem_samples)
-            
-            avg_val = round(avg_val, 1)
-            self._record_history('mem', avg_val)
-            return avg_val
-
-        except Exception as e:
-            if self.logger: self.logger.error(f"内存读取出错: {e}")
-            return 0
-    
-    def get_history(self):
-        """返回列表格式的历史数据"""
-        return {
-            'cpu': list(self.history['cpu']),
-            'mem': list(self.history['mem']),
-            'disk': list(self.history['disk'])
-        }
+        """获取内存5分钟平均 (来自最新快照)"""
+        return self._snapshot.get('mem_usage', 0)
+
+    def get_sensors(self):
+        """传感器清单及最新读数"""
+        slot = self.slots.get('thermal')
+        if slot is None:
+            return []
+        temps = self._snapshot.get('temps', {})
+        return [{**s, 'temp': temps.get(s['id'])} for s in slot.collector.describe()]
+
+    def rescan_sensors(self):
+        """按需重新发现温度传感器 (由采集线程在下一次唤醒时执行)"""
+        slot = self.slots.get('thermal')
+        if slot:
+            slot.collector.request_rescan()
+            slot.next_due = 0
+            self._wake.set()
+
+    def get_top_processes(self):
+        """最新的 Top-N 进程表 (来自快照)"""
+        return self._snapshot.get('procs', {'count': 0, 'top_cpu': [], 'top_rss': []})
+
+    def get_history(self, tier=None, since=0, keys=PINNED_HISTORY_KEYS, limit=None):
+        """
+        返回历史数据
+        :param tier: None 时返回 raw 层数值列表 (兼容旧格式)；'raw' / '1m' / '1h' 返回列式数据
+        :param since: 仅返回该时间戳之后的点
+        :param keys: 要返回的指标，未记录的指标忽略
+        :param limit: 每个指标最多返回最近的 limit 个点
+        """
+        if tier is None:
+            return {k: self.history.query(k, 'raw', since, limit)['val'] for k in PINNED_HISTORY_KEYS}
+        out = {}
+        for k in keys:
+            data = self.history.query(k, tier, since, limit)
+            if data is not None:
+                out[k] = data
+        return out
+
+    def history_keys(self):
+        """当前记录历史的指标名"""
+        return self.history.keys()
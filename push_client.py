@@ -3,6 +3,7 @@ import json
 import gzip
 import socket
 from datetime import datetime
+from instrument import METRICS
 
 class PushPlusClient:
     def __init__(self, user_list, logger=None):
@@ -20,6 +21,7 @@ class PushPlusClient:
         else:
             print(f"[{level.upper()}] {msg}")
 
+    @METRICS.timed('push.post')
     def _post(self, payload):
         conn = None
         try:
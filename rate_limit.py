@@ -0,0 +1,64 @@
+"""
+OmniMonitor 令牌桶限速
+- 按主机共享，并发请求时统一排队，替代请求之间的固定 sleep
+- 预约式取令牌：锁内只计算需要等待的时间，调用方在锁外 await asyncio.sleep
+"""
+
+import time
+import fnmatch
+import threading
+
+
+class TokenBucket:
+    """每秒补充 rate 个令牌，最多积攒 burst 个"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """预约一个令牌，返回需要等待的秒数 (令牌可被预支为负数，后来者依次顺延)"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    按主机名匹配的令牌桶集合
+    配置示例: {"devapi.qweather.com": {"rate": 2, "burst": 3}, "*.amap.com": {"rate": 5}}
+    """
+
+    def __init__(self, config=None):
+        self._lock = threading.Lock()
+        self.configure(config)
+
+    def configure(self, config):
+        with self._lock:
+            self.rules = dict(config or {})
+            self.buckets = {}   # 规则模式 -> TokenBucket (匹配同一规则的主机共享一个桶)
+            self._match = {}    # 主机 -> 规则模式 (None 表示不限速)
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self._match:
+                self._match[host] = next((p for p in self.rules if fnmatch.fnmatchcase(host, p)), None)
+            pattern = self._match[host]
+            if pattern is None:
+                return None
+            b = self.buckets.get(pattern)
+            if b is None:
+                rule = self.rules[pattern]
+                b = self.buckets[pattern] = TokenBucket(rule.get('rate', 1), rule.get('burst', 1))
+            return b
+
+    def reserve(self, host):
+        """预约一个令牌，返回需要等待的秒数 (供协程 await asyncio.sleep)，未配置的主机返回 0"""
+        b = self.bucket(host)
+        return b.reserve() if b else 0.0
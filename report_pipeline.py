@@ -0,0 +1,119 @@
+"""
+OmniMonitor 报告并行组装
+- 报告由若干组件 (每日一言 / 路况 / 天气 / 金价 / 系统状态 ...) 组成，组件之间可声明依赖
+- 所有组件在抓取事件循环中并发执行，每个组件有自己的截止时间 (从报告开始计时)
+- 超时或出错的组件以占位内容渲染，报告总耗时取决于最慢的组件或截止时间，而不是各组件耗时之和
+- 超时的抓取不会被取消，仍在后台完成并写入缓存，下一次报告可直接命中
+"""
+
+import time
+import asyncio
+import inspect
+from concurrent.futures import TimeoutError as FutureTimeout
+from instrument import METRICS
+
+OK, TIMEOUT, ERROR = 'ok', 'timeout', 'error'
+
+# 超时后仍在后台运行的组件任务 (持有引用防止被回收)
+_background = set()
+
+
+class ReportComponent:
+    __slots__ = ('name', 'fn', 'deps', 'deadline', 'placeholder')
+
+    def __init__(self, name, fn, deps=(), deadline=None, placeholder=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.deadline = deadline
+        self.placeholder = placeholder
+
+
+class ReportPipeline:
+    """
+    组件依赖图
+    fn 以依赖组件的结果作为关键字参数调用，返回协程 (在事件循环中并发) 或直接返回结果 (只应做轻量的读取)
+    """
+
+    def __init__(self, runner, deadline=20, deadlines=None, logger=None):
+        self.runner = runner
+        self.deadline = deadline                 # 默认截止时间 (秒)
+        self.deadlines = dict(deadlines or {})   # 组件名 -> 截止时间，覆盖 add() 中的默认值
+        self.logger = logger
+        self.components = {}
+        self.status = {}
+        self.elapsed = {}
+        self.results = {}   # 已完成组件的结果 (整体超时时其余组件以占位内容补齐)
+
+    def add(self, name, fn, deps=(), deadline=None, placeholder=None):
+        for d in deps:
+            if d not in self.components:
+                raise ValueError(f"组件 {name} 依赖未注册的组件: {d}")
+        deadline = self.deadlines.get(name, deadline)
+        self.components[name] = ReportComponent(name, fn, deps, deadline, placeholder)
+        return self
+
+    def run(self):
+        """同步执行全部组件 (在调度线程中调用)，返回 {组件名: 结果或占位内容}"""
+        limit = max((c.deadline or self.deadline) for c in self.components.values()) if self.components else 0
+        self.results = {}
+        future = self.runner.submit(self._run_all())
+        try:
+            return future.result(limit + 5)
+        except FutureTimeout:
+            # 事件循环被阻塞或依赖链过长：不丢弃整份报告，未完成的组件按超时渲染占位内容
+            future.cancel()
+            results = dict(self.results)
+            for name, comp in self.components.items():
+                if name not in results:
+                    self.status[name] = TIMEOUT
+                    results[name] = comp.placeholder
+            if self.logger:
+                self.logger.warning(f"报告组装超过 {limit + 5}s，未完成组件使用占位内容")
+            return results
+
+    async def _run_all(self):
+        start = time.monotonic()
+        tasks = {}
+        # 注册顺序即拓扑顺序 (add 时已保证依赖先注册)
+        for name, comp in self.components.items():
+            tasks[name] = asyncio.ensure_future(self._run_one(comp, tasks, start))
+        await asyncio.gather(*tasks.values())
+        results = {name: t.result() for name, t in tasks.items()}
+        late = [f"{n}({s})" for n, s in self.status.items() if s != OK]
+        if late and self.logger:
+            self.logger.warning(f"报告组件使用占位内容: {', '.join(late)}")
+        return results
+
+    async def _run_one(self, comp, tasks, start):
+        deps = {d: await tasks[d] for d in comp.deps}
+        remaining = start + (comp.deadline or self.deadline) - time.monotonic()
+        w0 = time.perf_counter()
+        try:
+            value = comp.fn(**deps)
+            if inspect.isawaitable(value):
+                # shield: 超时只是不再等待，抓取本身在后台继续完成
+                task = asyncio.ensure_future(value)
+                _background.add(task)
+                task.add_done_callback(_consume)
+                value = await asyncio.wait_for(asyncio.shield(task), max(0.0, remaining))
+            status = OK
+        except asyncio.TimeoutError:
+            value, status = comp.placeholder, TIMEOUT
+        except Exception as e:
+            if self.logger: self.logger.error(f"报告组件 {comp.name} 失败: {e}")
+            value, status = comp.placeholder, ERROR
+        wall = time.perf_counter() - w0
+        METRICS.record(f"report.{comp.name}", wall, 0.0, error=status != OK)
+        self.status[comp.name] = status
+        self.elapsed[comp.name] = round(wall, 3)
+        value = comp.placeholder if value is None else value
+        self.results[comp.name] = value
+        return value
+
+
+def _consume(task):
+    """释放引用并读取后台任务的异常，避免 "exception was never retrieved" 警告"""
+    _background.discard(task)
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,168 @@
+"""
+OmniMonitor 通勤路线缓存与时段画像
+- 缓存键: (起点, 终点, 方式, 时段)，只保存解析后的 分钟 / 公里，不保存原始响应
+- 按方式设置有效期: 骑行 / 步行路线几乎不变，缓存数天；公交按时刻表，缓存一天；驾车受路况影响，缓存数分钟
+- 画像: 按 (起点, 终点, 方式, 星期, 时段) 记录观测耗时的 EWMA，
+  报告中展示 "平时 vs 现在"，上游请求失败时退回画像值，不再额外请求
+- 画像与长期缓存保存在 JSON 文件中 (原子替换)，重启后无需重新请求
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 各方式的缓存有效期 (秒)
+DEFAULT_ROUTE_TTLS = {'driving': 600, 'transit': 86400, 'bicycling': 7 * 86400, 'walking': 7 * 86400}
+
+# 结果与时段无关的方式 (不按时段分键)
+STATIC_MODES = ('bicycling', 'walking')
+
+
+class RouteCache:
+    """线程安全的路线缓存与耗时画像，配置见 fetcher.routes"""
+
+    def __init__(self, config=None, logger=None):
+        cfg = config or {}
+        self.logger = logger
+        self._lock = threading.Lock()
+        self.entries = {}    # "起点|终点|方式|时段" -> {'minutes', 'km', 'ts'}
+        self.profiles = {}   # "起点|终点|方式|星期|时段" -> {'avg', 'n', 'ts'}
+        self.stats = {'hit': 0, 'miss': 0, 'fallback': 0}
+        self.configure(cfg)
+        path = cfg.get('path', '.route_profile.json')
+        self.path = path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+        self._dirty = False
+        self._load()
+
+    def configure(self, config):
+        cfg = config or {}
+        self.enabled = cfg.get('enable', True)
+        self.ttls = {**DEFAULT_ROUTE_TTLS, **cfg.get('ttl', {})}
+        self.slot_minutes = max(5, int(cfg.get('slot_minutes', 30)))
+        self.alpha = cfg.get('alpha', 0.3)          # 画像 EWMA 系数
+        self.max_profiles = int(cfg.get('max_profiles', 2000))
+
+    def _log(self, level, msg):
+        if self.logger: getattr(self.logger, level)(msg)
+
+    # ═══════════════════════════════════════
+    #  键
+    # ═══════════════════════════════════════
+
+    def _slot(self, ts):
+        dt = datetime.fromtimestamp(ts)
+        return dt.weekday(), (dt.hour * 60 + dt.minute) // self.slot_minutes
+
+    def _entry_key(self, origin, dest, mode, ts):
+        bucket = 'any' if mode in STATIC_MODES else self._slot(ts)[1]
+        return f"{origin}|{dest}|{mode}|{bucket}"
+
+    def _profile_key(self, origin, dest, mode, ts):
+        weekday, slot = self._slot(ts)
+        return f"{origin}|{dest}|{mode}|{weekday}|{slot}"
+
+    # ═══════════════════════════════════════
+    #  缓存 / 画像
+    # ═══════════════════════════════════════
+
+    def get(self, origin, dest, mode, max_age=None, now=None):
+        """查询未过期的路线结果 {'minutes', 'km', 'ts'}，未命中返回 None；max_age=0 强制刷新"""
+        now = now or time.time()
+        limit = self.ttls.get(mode, 0)
+        if max_age is not None:
+            limit = min(limit, max_age)
+        with self._lock:
+            item = self.entries.get(self._entry_key(origin, dest, mode, now)) if self.enabled else None
+            if item is not None and now - item['ts'] <= limit:
+                self.stats['hit'] += 1
+                return item
+            self.stats['miss'] += 1
+            return None
+
+    def put(self, origin, dest, mode, minutes, km, now=None):
+        """保存一次成功的查询结果，并计入当前星期 / 时段的耗时画像"""
+        now = now or time.time()
+        with self._lock:
+            self.entries[self._entry_key(origin, dest, mode, now)] = {'minutes': minutes, 'km': km, 'ts': int(now)}
+            pkey = self._profile_key(origin, dest, mode, now)
+            p = self.profiles.get(pkey)
+            if p is None:
+                p = self.profiles[pkey] = {'avg': float(minutes), 'n': 0, 'ts': int(now)}
+            else:
+                p['avg'] += self.alpha * (minutes - p['avg'])
+            p['n'] += 1
+            p['ts'] = int(now)
+            self._prune()
+            self._dirty = True
+
+    def usual(self, origin, dest, mode, now=None, min_samples=2):
+        """当前星期 / 时段的常态耗时 (分钟)；样本不足时返回 None"""
+        now = now or time.time()
+        with self._lock:
+            p = self.profiles.get(self._profile_key(origin, dest, mode, now))
+            if p is None or p['n'] < min_samples:
+                return None
+            return round(p['avg'])
+
+    def fallback(self, origin, dest, mode, now=None):
+        """
+        上游失败时的替代结果: 优先当前时段画像，其次同一时段已过期的缓存，都没有时返回 None
+        返回 {'minutes', 'km', 'ts', 'fallback': True}
+        """
+        now = now or time.time()
+        with self._lock:
+            last = self.entries.get(self._entry_key(origin, dest, mode, now))
+            p = self.profiles.get(self._profile_key(origin, dest, mode, now))
+            if p is None and last is None:
+                return None
+            self.stats['fallback'] += 1
+            minutes = round(p['avg']) if p else last['minutes']
+            return {'minutes': minutes, 'km': last['km'] if last else None, 'ts': (p or last)['ts'], 'fallback': True}
+
+    def _prune(self):
+        """清理过期缓存，画像按最近更新时间保留 max_profiles 条"""
+        now = time.time()
+        longest = max(self.ttls.values())
+        for k in [k for k, v in self.entries.items() if now - v['ts'] > longest]:
+            del self.entries[k]
+        if len(self.profiles) > self.max_profiles:
+            keep = sorted(self.profiles.items(), key=lambda kv: kv[1]['ts'])[-self.max_profiles:]
+            self.profiles = dict(keep)
+
+    # ═══════════════════════════════════════
+    #  持久化
+    # ═══════════════════════════════════════
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get('entries', {})
+            self.profiles = data.get('profiles', {})
+        except Exception as e:
+            self._log('warning', f"路线画像文件读取失败，重新积累: {e}")
+
+    def save(self):
+        """有变化时原子写入文件"""
+        with self._lock:
+            if not self._dirty:
+                return
+            text = json.dumps({'entries': self.entries, 'profiles': self.profiles}, ensure_ascii=False)
+            self._dirty = False
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self._log('error', f"路线画像保存失败: {e}")
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, 'entries': len(self.entries), 'profiles': len(self.profiles)}
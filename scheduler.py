@@ -1,10 +1,17 @@
 import time
 import gc
+import threading
 from datetime import datetime, timedelta
 import utils
+from window_agg import WindowRule
+from instrument import METRICS
+from gold_tracker import GoldPoller, GoldRule
+from bili_scheduler import BiliPoller
+from report_pipeline import ReportPipeline
 
 class TaskScheduler:
-    def __init__(self, config_mgr, logger, pusher, fetcher, monitor, cache_file, auth_mgr=None):
+    def __init__(self, config_mgr, logger, pusher, fetcher, monitor, cache_file, auth_mgr=None, gold_history=None,
+                 stop_event=None):
         self.cfg_mgr = config_mgr
         self.logger = logger
         self.pusher = pusher
@@ -12,16 +19,29 @@ class TaskScheduler:
         self.monitor = monitor
         self.cache_file = cache_file
         self.auth_mgr = auth_mgr
+        self.gold_history = gold_history
+        # 置位后主循环在当前一轮结束时退出 (SIGTERM 处理函数只置位，不打断正在进行的写入)
+        self.stop_event = stop_event or threading.Event()
         
         self.cache = self._load_cache()
         # 运行时状态记录
         self.ts_checks = {
-            'server': 0, 'gold': 0, 'weather': 0, 
+            'server': 0, 'network': 0, 'disk': 0, 'anomaly': 0, 'gold': 0, 'weather': 0, 
             'bilibili': 0, 'log_clean': 0,
             'log_flush': 0,        # 上次强制写盘时间戳
             'cyclic_interval': 0 
         }
         
+        # 金价自适应轮询 (间隔随波动率与距区间边缘的距离调整)
+        self.gold_poller = GoldPoller(self.cfg_mgr.data.get('active_alert', {}).get('gold', {}))
+        # B 站按 UP 主自适应轮询 (学到的发布时间保存在推送缓存中)
+        self.bili_poller = BiliPoller(self.cfg_mgr.data.get('active_alert', {}).get('bilibili', {}), self.cache.get('bili_profiles'))
+
+        # 已解析的窗口告警规则: 规则文本 -> WindowRule (解析失败为 None)
+        self._window_rules = {}
+        # 已解析的金价指标规则: 规则文本 -> GoldRule (解析失败为 None)
+        self._gold_rules = {}
+
         # 初始化读取冲刷间隔，默认 600 秒
         self._update_intervals()
 
@@ -42,8 +62,12 @@ class TaskScheduler:
 
     def _save_cache(self):
         import json
-        with open(self.cache_file, 'w', encoding='utf-8') as f:
+        import os
+        # 先写临时文件再原子替换，写到一半退出也不会留下损坏的缓存
+        tmp_path = self.cache_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(self.cache, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_file)
 
     def _check_cooldown(self, key, duration):
         last = self.cache.get(f"cd_{key}", 0)
@@ -63,50 +87,68 @@ class TaskScheduler:
 
     def start(self):
         self.logger.info("🚀 任务调度器已启动")
-        
-        while True:
-            try:
-                now = datetime.now()
-                ts_now = time.time()
-                config = self.cfg_mgr.data
 
-                # --- 0. 定时强制冲刷日志 (配置化间隔) ---
-                if ts_now - self.ts_checks['log_flush'] > self.flush_interval:
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    now = datetime.now()
+                    ts_now = time.time()
+                    config = self.cfg_mgr.data
+
+                    # 每次循环的耗时 (不含 sleep) 记入 scheduler.loop
+                    with METRICS.timer('scheduler.loop'):
+                        # --- 0. 定时强制冲刷日志 (配置化间隔) ---
+                        if ts_now - self.ts_checks['log_flush'] > self.flush_interval:
+                            self._flush_logs()
+                            self.ts_checks['log_flush'] = ts_now
+
+                        # --- 1. 热重载检测 ---
+                        if self.cfg_mgr.check_hot_reload():
+                            config = self.cfg_mgr.data
+                            self.pusher.users = config['pushplus_users']
+                            self.fetcher.apply_config(config)
+                            self._update_intervals() # 重新加载间隔配置
+                            self.monitor.apply_config(config.get('monitor', {}))
+                            if self.auth_mgr:
+                                self.auth_mgr.reload_users()
+                            self.logger.info(f"配置已重载，当前日志冲刷间隔: {self.flush_interval}s")
+
+                        # --- 2. 日志清理 ---
+                        if ts_now - self.ts_checks['log_clean'] > 86400:
+                            # 可以在这里显式调用 LoggerManager 的清理方法
+                            self.ts_checks['log_clean'] = ts_now
+
+                        # --- 3. 各种业务逻辑循环 ---
+                        with METRICS.timer('scheduler.cyclic_report'):
+                            self._run_cyclic_report(now, ts_now, config)
+                        with METRICS.timer('scheduler.active_alerts'):
+                            self._run_active_alerts(ts_now, config)
+                        with METRICS.timer('scheduler.scheduled_push'):
+                            self._run_scheduled_push(now, config)
+
+                    self.stop_event.wait(5)
+                    gc.collect()
+
+                except Exception as e:
+                    self.logger.error(f"调度循环异常: {e}")
                     self._flush_logs()
-                    self.ts_checks['log_flush'] = ts_now
-
-                # --- 1. 热重载检测 ---
-                if self.cfg_mgr.check_hot_reload():
-                    self.pusher.users = config['pushplus_users']
-                    self.fetcher.cfg = config
-                    self.fetcher.keys = config['api_keys']
-                    self._update_intervals() # 重新加载间隔配置
-                    if self.auth_mgr:
-                        self.auth_mgr.reload_users()
-                    self.logger.info(f"配置已重载，当前日志冲刷间隔: {self.flush_interval}s")
-
-                # --- 2. 日志清理 ---
-                if ts_now - self.ts_checks['log_clean'] > 86400:
-                    # 可以在这里显式调用 LoggerManager 的清理方法
-                    self.ts_checks['log_clean'] = ts_now
-
-                # --- 3. 各种业务逻辑循环 ---
-                self._run_cyclic_report(now, ts_now, config)
-                self._run_active_alerts(ts_now, config)
-                self._run_scheduled_push(now, config)
-
-                time.sleep(5)
-                gc.collect()
-
-            except KeyboardInterrupt:
-                self.logger.info("程序手动停止，正在冲刷日志并保存缓存...")
-                self._flush_logs()
-                self._save_cache()
-                break
-            except Exception as e:
-                self.logger.error(f"调度循环异常: {e}")
-                self._flush_logs() 
-                time.sleep(30)
+                    self.stop_event.wait(30)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """退出前保存状态：先落盘缓存与历史，再关闭会等待线程的组件"""
+        self.logger.info("程序停止，正在冲刷日志并保存缓存...")
+        try:
+            self._save_cache()
+        except Exception as e:
+            self.logger.error(f"推送缓存保存失败: {e}")
+        if self.gold_history: self.gold_history.close()
+        self.monitor.stop()
+        self.fetcher.close()
+        self._flush_logs()
 
     def _flush_logs(self):
         """遍历并强制执行日志 Handler 的 flush 操作"""
@@ -139,11 +181,17 @@ class TaskScheduler:
 
         if should_run:
             self.logger.info("执行状态上报...")
-            weather = self.fetcher.get_weather_simple_html(cfg['locations'])
-            gold = self.fetcher.get_gold_price()
-            d_usage = self.monitor.get_disk_usage()
-            c_temp = self.monitor.get_cpu_temp()
-            m_usage = self.monitor.get_memory_usage()
+            # 天气与金价并发抓取，自身开销摘要等两者结束后再统计
+            pipe = self._report_pipeline(config)
+            pipe.add('weather', lambda: self.fetcher.get_weather_simple_html_async(cfg['locations']), placeholder=self.WEATHER_PLACEHOLDER)
+            pipe.add('gold', lambda: self.fetcher.get_gold_price_async())
+            pipe.add('self_cost', lambda **_: self._self_cost_html() if cfg.get('show_self_cost', True) else '', deps=('weather', 'gold'), placeholder='')
+            parts = pipe.run()
+            weather, gold = parts['weather'], parts['gold']
+            snap = self.monitor.snapshot
+            d_usage = snap.get('disk_usage', 0)
+            c_temp = snap.get('cpu_temp', 0)
+            m_usage = snap.get('mem_usage', 0)
 
             html = f"""
             <div style="background:#f4f6f8; padding:15px; border-radius:8px;">
@@ -152,6 +200,7 @@ class TaskScheduler:
                 <div style="margin-top:10px; padding-top:10px; border-top:1px dashed #ccc;">
                     <p style="margin:5px 0;">💰 <b>金价:</b> <span style="color:#d35400">{gold if gold else 'N/A'}</span></p>
                     <p style="margin:5px 0;">🖥️ <b>Sys:</b> 磁盘{d_usage}% | 内存{m_usage}% | 温度{c_temp}°C</p>
+                    {parts['self_cost']}
                 </div>
                 <p style="text-align:right; margin:0; font-size:12px; color:#999;">{now.strftime('%H:%M')}</p>
             </div>
@@ -165,31 +214,83 @@ class TaskScheduler:
         # A. Server
         srv = cfg.get('server', {})
         if ts_now - self.ts_checks['server'] >= srv.get('check_interval', 60):
-            temp = self.monitor.get_cpu_temp()
-            disk = self.monitor.get_disk_usage()
-            mem = self.monitor.get_memory_usage()
+            # 读取采集线程发布的快照，不在调度线程内做任何采样
+            snap = self.monitor.snapshot
+            temp = snap.get('cpu_temp', 0)
+            disk = snap.get('disk_usage', 0)
+            mem = snap.get('mem_usage', 0)
             
             warns = []
-            if temp > srv.get('cpu_temp_threshold', 75): warns.append(f"🔥 CPU温度: <b>{temp}°C</b>")
+            if srv.get('temp_thresholds'):
+                warns += self._check_temps(snap, srv)
+            elif temp > srv.get('cpu_temp_threshold', 75): warns.append(f"🔥 CPU温度: <b>{temp}°C</b>")
             if disk > srv.get('disk_usage_threshold', 90): warns.append(f"💾 磁盘满: <b>{disk}%</b>")
+            warns += self._check_pressure(snap, srv)
+            warns += self._eval_window_rules(srv.get('rules', []))
             
             if warns and self._check_cooldown('server', srv.get('alert_cooldown', 3600)):
                 warns.append(f"🧠 内存(5m): {mem}%")
                 self.logger.warning(f"服务器报警: {warns}")
-                self.pusher.send("🔴 服务器报警", self._make_card("🚨 紧急", "<br>".join(warns)))
+                self.pusher.send("🔴 服务器报警", self._make_card("🚨 紧急", "<br>".join(warns) + self._top_process_html()))
                 self._update_cooldown('server')
             self.ts_checks['server'] = ts_now
 
-        # B. Gold
+        # A2. Network (未配置 network 段时不检查)
+        net_cfg = cfg.get('network', {})
+        if net_cfg and ts_now - self.ts_checks['network'] >= net_cfg.get('check_interval', 60):
+            warns = self._check_network(self.monitor.snapshot.get('net', {}), net_cfg)
+            if warns and self._check_cooldown('network', net_cfg.get('alert_cooldown', 3600)):
+                self.logger.warning(f"网络报警: {warns}")
+                self.pusher.send("🌐 网络报警", self._make_card("🚨 网络异常", "<br>".join(warns), "#8e44ad"))
+                self._update_cooldown('network')
+            self.ts_checks['network'] = ts_now
+
+        # A3. Disks (按挂载点阈值，未配置 disk 段时不检查)
+        dk_cfg = cfg.get('disk', {})
+        if dk_cfg and ts_now - self.ts_checks['disk'] >= dk_cfg.get('check_interval', 300):
+            warns = self._check_disks(self.monitor.snapshot.get('disks', {}), dk_cfg)
+            if warns and self._check_cooldown('disk', dk_cfg.get('alert_cooldown', 3600)):
+                self.logger.warning(f"磁盘报警: {warns}")
+                self.pusher.send("💽 磁盘报警", self._make_card("🚨 磁盘异常", "<br>".join(warns), "#e67e22"))
+                self._update_cooldown('disk')
+            self.ts_checks['disk'] = ts_now
+
+        # A4. Anomaly (采集线程增量检测，这里只读取快照中的活跃事件)
+        an_cfg = cfg.get('anomaly', {})
+        if an_cfg.get('enable') and ts_now - self.ts_checks['anomaly'] >= an_cfg.get('check_interval', 60):
+            lines = []
+            for ev in self.monitor.snapshot.get('anomalies', []):
+                cd_key = f"anomaly_{ev['key']}_{ev['kind']}"
+                if self._check_cooldown(cd_key, an_cfg.get('alert_cooldown', 3600)):
+                    lines.append(self._format_anomaly(ev))
+                    self._update_cooldown(cd_key)
+            if lines:
+                self.logger.warning(f"指标异常: {lines}")
+                self.pusher.send("📉 指标异常", self._make_card("🧭 异常检测", "<br>".join(lines), "#16a085"))
+            self.ts_checks['anomaly'] = ts_now
+
+        # B. Gold (自适应间隔：靠近区间边缘或波动加快时缩短，平静或休市时拉长)
         gold_cfg = cfg.get('gold', {})
-        if ts_now - self.ts_checks['gold'] >= gold_cfg.get('check_interval', 600):
+        if ts_now >= self.gold_poller.next_due:
+            self.gold_poller.configure(gold_cfg)
             price = self.fetcher.get_gold_price()
+            low, high = gold_cfg.get('low', 0), gold_cfg.get('high', 9999)
             if price:
-                low, high = gold_cfg.get('low', 0), gold_cfg.get('high', 9999)
+                self.gold_poller.observe(price, ts_now)
                 if (price < low or price > high) and self._check_cooldown('gold', gold_cfg.get('alert_cooldown', 14400)):
                     self.logger.warning(f"金价越界: {price}")
                     self.pusher.send(f"⚠️ 金价: {price}", self._make_card("💰 价格提醒", f"当前: {price}", "#f39c12"))
                     self._update_cooldown('gold')
+                if self.gold_history:
+                    self.gold_history.add(ts_now, price)
+                    warns = self._eval_gold_rules(gold_cfg.get('rules', []))
+                    if warns and self._check_cooldown('gold_trend', gold_cfg.get('alert_cooldown', 14400)):
+                        self.logger.warning(f"金价异动: {warns}")
+                        self.pusher.send(f"📉 金价异动: {price}", self._make_card("💰 走势提醒", "<br>".join(warns) + self._gold_day_html(), "#f39c12"))
+                        self._update_cooldown('gold_trend')
+                self.gold_poller.schedule(ts_now, low, high)
+            else:
+                self.gold_poller.next_due = ts_now + gold_cfg.get('check_interval', 600)
             self.ts_checks['gold'] = ts_now
 
         # C. Weather
@@ -209,21 +310,190 @@ class TaskScheduler:
                         self._update_cooldown(cd_key)
             self.ts_checks['weather'] = ts_now
 
-        # D. Bilibili
+        # D. Bilibili (每个 UP 主独立的查询时间，按其发布频率与常见时段调整；每次循环最多查询一个)
         bili = cfg.get('bilibili', {})
-        if ts_now - self.ts_checks['bilibili'] >= bili.get('check_interval', 1200):
-            for up in bili.get('uids', []):
-                v = self.fetcher.get_bilibili_latest(up['uid'])
-                if v:
-                    k = f"bili_{up['uid']}"
-                    if v['bvid'] != self.cache.get(k):
-                        self.logger.info(f"B站更新: {up['name']}")
-                        html = self._make_card(f"{up['name']} 更新", f"{v['title']}<br><img src='{v['pic']}' style='width:100%'><br><a href='https://www.bilibili.com/video/{v['bvid']}'>观看</a>", "#fb7299")
-                        self.pusher.send(f"📺 {up['name']}", html)
-                        self.cache[k] = v['bvid']
-                        self._save_cache()
+        ups = {str(up['uid']): up for up in bili.get('uids', [])}
+        self.bili_poller.configure(bili)
+        self.bili_poller.sync(list(ups), ts_now)
+        uid = self.bili_poller.next(ts_now)
+        if uid:
+            up = ups[uid]
+            if self.bili_poller.needs_history(uid, ts_now):
+                # 尚无规律：拉取近期投稿列表一次性学习发布时间
+                vlist = self.fetcher.get_bilibili_videos(uid)
+                v = vlist[0] if vlist else None
+                if vlist is not None:
+                    self.bili_poller.history_fetched(uid, ts_now)
+            else:
+                v = self.fetcher.get_bilibili_latest(uid)
+                vlist = [v] if v else []
+            if vlist and self.bili_poller.learn(uid, [x.get('created') for x in vlist]):
+                self.cache['bili_profiles'] = self.bili_poller.profiles()
+                self._save_cache()
+            if v:
+                k = f"bili_{uid}"
+                if v['bvid'] != self.cache.get(k):
+                    self.logger.info(f"B站更新: {up['name']}")
+                    html = self._make_card(f"{up['name']} 更新", f"{v['title']}<br><img src='{v['pic']}' style='width:100%'><br><a href='https://www.bilibili.com/video/{v['bvid']}'>观看</a>", "#fb7299")
+                    self.pusher.send(f"📺 {up['name']}", html)
+                    self.cache[k] = v['bvid']
+                    self._save_cache()
+            self.bili_poller.schedule(uid, ts_now)
             self.ts_checks['bilibili'] = ts_now
 
+    def _self_cost_html(self):
+        """状态报告中的自身开销摘要：进程 CPU / 内存，以及报告各部分与整体耗时占比"""
+        proc = METRICS.process()
+
+        def fmt(items, strip=0):
+            return ", ".join(f"{n[strip:]} {int(share * 100)}%" for n, _, share, _ in items)
+
+        report = fmt(METRICS.top('report.'), len('report.'))
+        overall = fmt(METRICS.top(exclude=('scheduler.', 'report.')))
+        return f"""
+                    <p style="margin:5px 0; font-size:12px; color:#888;">🧪 <b>自身:</b> CPU {proc['cpu_pct']}% | 内存 {proc.get('rss_mb', proc['max_rss_mb'])}MB</p>
+                    <p style="margin:5px 0; font-size:12px; color:#888;">⏱️ 报告耗时: {report or 'N/A'} | 累计耗时: {overall or 'N/A'}</p>"""
+
+    def _top_process_html(self):
+        """报警卡片附带的 Top-N 进程表 (按 CPU 排序)"""
+        top = self.monitor.get_top_processes().get('top_cpu', [])
+        if not top: return ""
+        td = "padding:4px 6px; border-bottom:1px solid #eee; font-size:12px;"
+        rows = "".join(
+            f"<tr><td style='{td}'>{p['name']}</td><td style='{td} color:#999'>{p['pid']}</td>"
+            f"<td style='{td} text-align:right'>{p['cpu']}%</td><td style='{td} text-align:right'>{p['rss_mb']}MB</td></tr>"
+            for p in top
+        )
+        return f"""
+        <div style="margin-top:10px; font-weight:bold; font-size:13px;">🔎 Top 进程</div>
+        <table style="width:100%; border-collapse:collapse; margin-top:5px;">{rows}</table>
+        """
+
+    def _check_temps(self, snap, srv):
+        """
+        按传感器检查温度
+        阈值优先级: temp_thresholds[传感器ID] > cpu_temp_threshold (仅主传感器) > temp_thresholds['default']
+        """
+        th = srv.get('temp_thresholds', {})
+        primary = snap.get('cpu_temp_sensor')
+        warns = []
+        for sid, t in snap.get('temps', {}).items():
+            limit = th.get(sid)
+            if limit is None and sid == primary:
+                limit = srv.get('cpu_temp_threshold')
+            if limit is None:
+                limit = th.get('default', 0)
+            if limit and t > limit:
+                warns.append(f"🔥 {sid} 温度: <b>{t}°C</b>")
+        return warns
+
+    def _check_pressure(self, snap, srv):
+        """
+        检查 PSI 压力 (avg10，百分比) 与每核负载
+        psi_thresholds 的键为 <资源>_<some|full>，例如 memory_full: 10；0 或未配置表示不检查
+        """
+        labels = {'cpu': "CPU", 'memory': "内存", 'io': "IO"}
+        warns = []
+        for name, limit in srv.get('psi_thresholds', {}).items():
+            res, _, kind = name.partition('_')
+            val = snap.get('psi', {}).get(res, {}).get(kind, {}).get('avg10')
+            if limit and val is not None and val > limit:
+                warns.append(f"🧱 {labels.get(res, res)}压力 ({kind}): <b>{val}%</b>")
+        load_th = srv.get('load_per_core_threshold', 0)
+        load = snap.get('load_per_core')
+        if load_th and load is not None and load > load_th:
+            warns.append(f"🏋️ 每核负载: <b>{load}</b> (load1 {snap.get('load1')})")
+        return warns
+
+    def _check_network(self, net, net_cfg):
+        """按网卡检查吞吐 / 错误 / 丢包阈值 (阈值为 0 表示不检查)"""
+        rx_th = net_cfg.get('rx_mbps_threshold', 0)
+        tx_th = net_cfg.get('tx_mbps_threshold', 0)
+        err_th = net_cfg.get('errors_per_sec_threshold', 0)
+        drop_th = net_cfg.get('drops_per_sec_threshold', 0)
+
+        warns = []
+        for iface, st in net.items():
+            rx_mbps = st['rx_bps'] * 8 / 1e6
+            tx_mbps = st['tx_bps'] * 8 / 1e6
+            errs = st['rx_errs'] + st['tx_errs']
+            drops = st['rx_drop'] + st['tx_drop']
+            if rx_th and rx_mbps > rx_th: warns.append(f"⬇️ {iface} 下行: <b>{rx_mbps:.1f} Mbps</b>")
+            if tx_th and tx_mbps > tx_th: warns.append(f"⬆️ {iface} 上行: <b>{tx_mbps:.1f} Mbps</b>")
+            if err_th and errs > err_th: warns.append(f"⚠️ {iface} 错误: <b>{errs:.1f}/s</b>")
+            if drop_th and drops > drop_th: warns.append(f"🗑️ {iface} 丢包: <b>{drops:.1f}/s</b>")
+        return warns
+
+    def _check_disks(self, disks, dk_cfg):
+        """按挂载点检查空间 / inode / 服务时间 / 繁忙度 (mounts 中的配置覆盖 default，0 表示不检查)"""
+        labels = {
+            'usage': ("💾", "空间", "%"),
+            'inode_usage': ("🗂️", "inode", "%"),
+            'await_ms': ("🐢", "平均服务时间", "ms"),
+            'util': ("⏳", "繁忙度", "%"),
+        }
+        default = dk_cfg.get('default', {})
+        per_mount = dk_cfg.get('mounts', {})
+
+        warns = []
+        for mp, info in disks.items():
+            th = {**default, **per_mount.get(mp, {})}
+            for key, (icon, label, unit) in labels.items():
+                limit, val = th.get(key, 0), info.get(key)
+                if limit and val is not None and val > limit:
+                    warns.append(f"{icon} {mp} {label}: <b>{val}{unit}</b>")
+        return warns
+
+    def _format_anomaly(self, ev):
+        if ev['kind'] == 'deviation':
+            return f"📊 {ev['key']} 偏离常态: <b>{ev['value']}</b> (均值 {ev['mean']}, z={ev['z']})"
+        if ev['kind'] == 'rate':
+            return f"🚀 {ev['key']} 变化过快: <b>{ev['rate']}/分钟</b> (当前 {ev['value']})"
+        return f"⌛ {ev['key']} 预计 <b>{ev['hours']} 小时</b>后占满 (当前 {ev['value']}%, +{ev['rate']}%/分钟)"
+
+    def _eval_window_rules(self, rules):
+        """评估窗口告警规则 (例如 "cpu_temp avg over 5m > 75")，返回触发的告警行"""
+        warns = []
+        for text in rules:
+            if text not in self._window_rules:
+                try:
+                    self._window_rules[text] = WindowRule.parse(text)
+                except ValueError as e:
+                    self.logger.warning(str(e))
+                    self._window_rules[text] = None
+            rule = self._window_rules[text]
+            if rule is None:
+                continue
+            hit, value = rule.evaluate(self.monitor.windows, time.time())
+            if hit:
+                warns.append(f"📈 {rule.text}: 当前 <b>{value}</b>")
+        return warns
+
+    def _eval_gold_rules(self, rules):
+        """评估金价指标规则 (例如 "change 30m <= -1.5")，返回触发的告警行"""
+        warns = []
+        for text in rules:
+            if text not in self._gold_rules:
+                try:
+                    self._gold_rules[text] = GoldRule.parse(text)
+                except ValueError as e:
+                    self.logger.warning(str(e))
+                    self._gold_rules[text] = None
+            rule = self._gold_rules[text]
+            if rule is None:
+                continue
+            hit, value = rule.check(self.gold_history)
+            if hit:
+                unit = '%' if rule.kind in ('change', 'day_change') else ''
+                warns.append(f"📈 {rule.text}: 当前 <b>{value}{unit}</b>")
+        return warns
+
+    def _gold_day_html(self):
+        """金价提醒卡片附带的当日开盘 / 高低点"""
+        day = self.gold_history.latest.get('day')
+        if not day: return ""
+        return f"<br><span style='color:#888; font-size:12px;'>今日 开 {day['open']} / 高 {day['high']} / 低 {day['low']} ({day['change']:+}%)</span>"
+
     def _run_scheduled_push(self, now, config):
         sch = config.get('scheduled_push', {})
         cm = sch.get('commute', {})
@@ -250,6 +520,13 @@ class TaskScheduler:
             self.cache['last_evt'] = today_str
             self._save_cache()
 
+    WEATHER_PLACEHOLDER = "<p style='color:#999; font-size:13px;'>🌤️ 天气获取超时</p>"
+
+    def _report_pipeline(self, config):
+        """报告组件依赖图；截止时间见 report.deadline / report.deadlines (按组件名覆盖)"""
+        rcfg = config.get('report', {})
+        return ReportPipeline(self.fetcher.runner, rcfg.get('deadline', 20), rcfg.get('deadlines'), self.logger)
+
     def _send_daily_report(self, title, is_am, config, color, today_str):
         self.logger.info(f"生成 {title} 报告...")
         cm = config['scheduled_push']['commute']
@@ -258,14 +535,19 @@ class TaskScheduler:
         try: city = config['cyclic_report']['locations'][0]['name']
         except: pass
 
-        quote = self.fetcher.get_daily_quote()
         s, e = (cm['home_loc'], cm['work_loc']) if is_am else (cm['work_loc'], cm['home_loc'])
-        traffic = self.fetcher.get_commute_full_report(s, e, city)
-        weather = self.fetcher.get_weather_simple_html(config['cyclic_report']['locations'])
-        gold = self.fetcher.get_gold_price()
-        mem = self.monitor.get_memory_usage()
-        disk = self.monitor.get_disk_usage()
-        temp = self.monitor.get_cpu_temp()
+        # 各部分并发抓取，各自有截止时间，超时的部分以占位内容代替
+        pipe = self._report_pipeline(config)
+        pipe.add('quote', lambda: self.fetcher.get_daily_quote_async(), placeholder="保持热爱，奔赴山海。")
+        pipe.add('traffic', lambda: self.fetcher.get_commute_full_report_async(s, e, city), placeholder="路况获取超时，稍后可在高德地图查看")
+        pipe.add('weather', lambda: self.fetcher.get_weather_simple_html_async(config['cyclic_report']['locations']), placeholder=self.WEATHER_PLACEHOLDER)
+        pipe.add('gold', lambda: self.fetcher.get_gold_price_async())
+        parts = pipe.run()
+        quote, traffic, weather, gold = parts['quote'], parts['traffic'], parts['weather'], parts['gold']
+        snap = self.monitor.snapshot
+        mem = snap.get('mem_usage', 0)
+        disk = snap.get('disk_usage', 0)
+        temp = snap.get('cpu_temp', 0)
         cd = utils.get_countdown_html(config['scheduled_push']['countdowns']) if is_am else ""
 
         html = f"""
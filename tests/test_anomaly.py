@@ -0,0 +1,41 @@
+from anomaly import AnomalyDetector
+from monitor import SystemMonitor
+
+KEY = 'disk_usb_usage'
+
+
+def _feed_until_ttf(detector, start=0, step=60):
+    """磁盘占用每分钟增长 1%，直到触发占满时间事件，返回最后一个样本的时间"""
+    ts = start
+    for i in range(80):
+        ts = start + i * step
+        detector.update(KEY, ts, 10.0 + i)
+        if any(e['kind'] == 'ttf' for e in detector.active_events(ts)):
+            return ts
+    raise AssertionError("ttf 事件未触发")
+
+
+def test_stale_event_expires_without_updates():
+    detector = AnomalyDetector({'min_samples': 5, 'hold_seconds': 180})
+    last = _feed_until_ttf(detector)
+    assert detector.active_events(last + 60)
+    # 超过 hold + 采样周期后不再视为活跃
+    assert detector.active_events(last + 180 + 60 + 1) == []
+
+
+def test_expire_history_forgets_anomaly_state():
+    monitor = SystemMonitor(None, {
+        'collectors': {},
+        'persist': {'enable': False},
+        'history': {'expire_after': 600},
+        'anomaly': {'min_samples': 5},
+    })
+    last = _feed_until_ttf(monitor.anomaly)
+    for ts in range(0, last + 1, 60):
+        monitor.history.add(KEY, ts, 50.0)
+
+    # 指标停止上报 (例如 U 盘被卸载) 后运行过期清理
+    now = last + 601
+    assert KEY in monitor.expire_history(now)
+    assert monitor.anomaly.describe(KEY) is None
+    assert monitor.anomaly.active_events(now) == []
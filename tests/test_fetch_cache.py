@@ -0,0 +1,44 @@
+import asyncio
+
+from fetch_cache import SingleFlight
+
+
+def test_follower_gets_value_when_leader_is_cancelled():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        leader = asyncio.ensure_future(flight.do_async('k', fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async('k', fetch))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        assert await follower == 'value'
+        assert leader.cancelled()
+        assert calls == [1]
+        assert flight.stats == {'leaders': 1, 'shared': 1}
+        await asyncio.sleep(0)
+        assert flight.in_flight() == 0
+
+    asyncio.run(scenario())
+
+
+def test_error_is_shared_with_followers():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError('boom')
+
+        results = await asyncio.gather(
+            flight.do_async('k', fetch), flight.do_async('k', fetch), return_exceptions=True)
+        assert [type(r) for r in results] == [ValueError, ValueError]
+
+    asyncio.run(scenario())
@@ -4,23 +4,31 @@ import time
 import os
 import re
 import socketserver
-from urllib.parse import unquote
+from urllib.parse import unquote, urlparse, parse_qs
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from web_template import HTML_TEMPLATE
+from history_store import TIERS as HISTORY_TIERS
+from monitor import is_script_entry
+from instrument import METRICS
 import utils
 
+# /api/history 单次请求的上限：每个指标返回的点数、指标数
+HISTORY_MAX_POINTS = 1000
+HISTORY_MAX_KEYS = 16
+
 
 class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
     daemon_threads = True
 
 
 class WebService:
-    def __init__(self, config_manager, logger, fetcher, monitor, auth_mgr, port=8888):
+    def __init__(self, config_manager, logger, fetcher, monitor, auth_mgr, gold_history=None, port=8888):
         self.cfg_mgr = config_manager
         self.logger = logger
         self.fetcher = fetcher
         self.monitor = monitor
         self.auth_mgr = auth_mgr
+        self.gold_history = gold_history
         self.port = port
         self.server = None
         self.thread = None
@@ -63,6 +71,27 @@ class WebService:
         for k in required:
             if k not in config:
                 return False, f"Missing {k}"
+        # 脚本采集器会在主机上执行命令，只能在本地 scripts.json 中定义
+        collectors = config.get('monitor', {}).get('collectors', {})
+        if not isinstance(collectors, dict):
+            return False, "monitor.collectors must be dict"
+        for name, opts in collectors.items():
+            if is_script_entry(name, opts):
+                return False, f"Script collector '{name}' is not allowed here, define it in scripts.json"
+        # 持久化文件会被覆盖 / 重建，只允许项目目录内、带专用后缀的相对路径
+        data_paths = {
+            'monitor.persist.path': (config.get('monitor', {}).get('persist', {}), '.omts'),
+            'active_alert.gold.history.path': (
+                config.get('active_alert', {}).get('gold', {}).get('history', {}), '.omts'),
+            'fetcher.routes.path': (config.get('fetcher', {}).get('routes', {}), '.route_profile.json'),
+        }
+        for label, (section, suffix) in data_paths.items():
+            path = section.get('path') if isinstance(section, dict) else None
+            if path is None:
+                continue
+            if not isinstance(path, str) or os.path.isabs(path) \
+                    or '..' in path.replace('\\', '/').split('/') or not path.endswith(suffix):
+                return False, f"{label} must be a relative path inside the project directory ending with {suffix}"
         return True, ""
 
     # ═══════════════════════════════════════
@@ -74,6 +103,7 @@ class WebService:
         fetcher = self.fetcher
         monitor = self.monitor
         auth_mgr = self.auth_mgr
+        gold_history = self.gold_history
         service_ref = self
         security_headers = self.security_headers
 
@@ -227,11 +257,8 @@ class WebService:
                             except:
                                 pass
 
-                        sys_status = {
-                            'cpu_temp': monitor.get_cpu_temp(),
-                            'disk_usage': monitor.get_disk_usage(),
-                            'mem_usage': monitor.get_memory_usage(),
-                        }
+                        # 只读采集线程发布的快照，请求路径不产生任何文件 I/O
+                        sys_status = monitor.snapshot.to_dict()
 
                         countdowns = []
                         config_evts = cfg_mgr.data.get('scheduled_push', {}).get('countdowns', [])
@@ -249,9 +276,84 @@ class WebService:
                             'quote': service_ref.cached_quote,
                             'system': sys_status,
                             'countdowns': countdowns,
+                            'upstreams': fetcher.breakers.snapshot(),
                         }
                         self._json(200, resp)
 
+                    # 6. API: 历史趋势 (需认证) ?tier=raw|1m|1h&since=<unix ts>
+                    elif urlparse(self.path).path == '/api/history':
+                        auth_result = self._check_auth()
+                        if auth_result is None:
+                            return
+                        qs = parse_qs(urlparse(self.path).query)
+                        tier = qs.get('tier', ['1m'])[0]
+                        if tier not in HISTORY_TIERS:
+                            self._json_error(400, f'未知层级: {tier}')
+                            return
+                        try:
+                            since = float(qs.get('since', ['0'])[0])
+                            max_points = int(qs.get('max_points', [str(HISTORY_MAX_POINTS)])[0])
+                        except ValueError:
+                            self._json_error(400, 'since / max_points 参数无效')
+                            return
+                        max_points = max(1, min(max_points, HISTORY_MAX_POINTS))
+                        keys = [k for k in qs.get('keys', ['cpu,mem,disk'])[0].split(',') if k][:HISTORY_MAX_KEYS]
+                        self._json(200, {
+                            'tier': tier,
+                            'series': monitor.get_history(tier, since, keys, max_points),
+                            'available': monitor.history_keys(),
+                        })
+
+                    # 7. API: Top-N 进程 (需认证)
+                    elif self.path == '/api/processes':
+                        auth_result = self._check_auth()
+                        if auth_result is None:
+                            return
+                        self._json(200, monitor.get_top_processes())
+
+                    # 8. API: 温度传感器清单 (需认证)
+                    elif self.path == '/api/sensors':
+                        auth_result = self._check_auth()
+                        if auth_result is None:
+                            return
+                        self._json(200, {'sensors': monitor.get_sensors()})
+
+                    # 9. API: 采集器清单 (需认证)
+                    elif self.path == '/api/collectors':
+                        auth_result = self._check_auth()
+                        if auth_result is None:
+                            return
+                        self._json(200, {'collectors': monitor.get_collectors()})
+
+                    # 10. API: 自身开销统计 (需管理员) 采集 / 抓取 / 推送 / 调度循环的耗时直方图，外部接口缓存命中率
+                    elif self.path == '/api/instrument':
+                        auth_result = self._check_auth(require_admin=True)
+                        if auth_result is None:
+                            return
+                        self._json(200, {**METRICS.snapshot(), 'fetch_cache': fetcher.cache.stats(), 'single_flight': fetcher.flight.stats, 'routes': fetcher.routes.snapshot()})
+
+                    # 11. API: 金价历史 (需认证) ?tier=raw|1m|1h&since=<unix ts>，未指定层级时按时间跨度选择
+                    #     序列与指标均在写入时增量维护，这里只做读取
+                    elif urlparse(self.path).path == '/api/gold/history':
+                        auth_result = self._check_auth()
+                        if auth_result is None:
+                            return
+                        if gold_history is None:
+                            self._json_error(404, '金价历史未启用')
+                            return
+                        qs = parse_qs(urlparse(self.path).query)
+                        try:
+                            since = float(qs.get('since', ['0'])[0])
+                        except ValueError:
+                            self._json_error(400, 'since 参数无效')
+                            return
+                        span = time.time() - since
+                        tier = qs.get('tier', [None])[0] or ('raw' if span <= 6 * 3600 else '1m' if span <= 2 * 86400 else '1h')
+                        if tier not in HISTORY_TIERS:
+                            self._json_error(400, f'未知层级: {tier}')
+                            return
+                        self._json(200, {'tier': tier, 'series': gold_history.query(tier, since), 'indicators': gold_history.latest})
+
                     else:
                         self.send_error(404)
 
@@ -307,6 +409,15 @@ class WebService:
                         self._json(200, {'status': 'ok'})
                         return
 
+                    # ── 重新发现温度传感器 (需管理员) ──
+                    if self.path == '/api/sensors/rescan':
+                        auth_result = self._check_auth(require_admin=True)
+                        if auth_result is None:
+                            return
+                        monitor.rescan_sensors()
+                        self._json(200, {'status': 'ok', 'message': '将在下一个采集周期重新发现传感器'})
+                        return
+
                     self.send_error(404)
 
                 except Exception as e:
@@ -0,0 +1,217 @@
+"""
+OmniMonitor 流式滑动窗口聚合
+- 每个窗口: 累加和求 avg，单调队列求 min / max，均摊 O(1)
+- p95 使用对数分桶直方图近似 (相对误差约 1%)
+- 告警规则可直接引用窗口统计，例如 "cpu_temp avg over 5m > 75"
+"""
+
+import math
+import re
+import threading
+from collections import deque
+
+# 默认为每个指标维护的窗口 (秒)
+DEFAULT_SPANS = (60, 300, 900)
+
+# p95 直方图的对数分桶底数，桶宽约 2%，取中值误差约 1%
+_HIST_BASE = 1.02
+_LN_BASE = math.log(_HIST_BASE)
+
+
+def _quantize(value):
+    """将数值映射到对数桶的代表值"""
+    if value == 0:
+        return 0.0
+    q = _HIST_BASE ** round(math.log(abs(value)) / _LN_BASE)
+    return math.copysign(q, value)
+
+
+class SlidingWindow:
+    """单个时间窗口上的流式统计"""
+    __slots__ = ('span', 'samples', 'total', '_mins', '_maxs', '_hist')
+
+    def __init__(self, span):
+        self.span = span
+        self.samples = deque()   # (ts, value)
+        self.total = 0.0
+        self._mins = deque()     # 单调递增 (ts, value)
+        self._maxs = deque()     # 单调递减 (ts, value)
+        self._hist = {}          # 分桶代表值 -> 计数
+
+    def add(self, ts, value):
+        self.samples.append((ts, value))
+        self.total += value
+
+        while self._mins and self._mins[-1][1] >= value:
+            self._mins.pop()
+        self._mins.append((ts, value))
+        while self._maxs and self._maxs[-1][1] <= value:
+            self._maxs.pop()
+        self._maxs.append((ts, value))
+
+        q = _quantize(value)
+        self._hist[q] = self._hist.get(q, 0) + 1
+        self.expire(ts)
+
+    def expire(self, now):
+        cutoff = now - self.span
+        samples = self.samples
+        while samples and samples[0][0] <= cutoff:
+            _, v = samples.popleft()
+            self.total -= v
+            q = _quantize(v)
+            n = self._hist[q] - 1
+            if n: self._hist[q] = n
+            else: del self._hist[q]
+        while self._mins and self._mins[0][0] <= cutoff:
+            self._mins.popleft()
+        while self._maxs and self._maxs[0][0] <= cutoff:
+            self._maxs.popleft()
+        if not samples:
+            self.total = 0.0  # 窗口清空时顺便消除浮点累计误差
+
+    @property
+    def count(self):
+        return len(self.samples)
+
+    def avg(self):
+        return self.total / len(self.samples) if self.samples else None
+
+    def min(self):
+        return self._mins[0][1] if self._mins else None
+
+    def max(self):
+        return self._maxs[0][1] if self._maxs else None
+
+    def last(self):
+        return self.samples[-1][1] if self.samples else None
+
+    def percentile(self, pct):
+        """近似分位数 (按桶遍历，桶数量远小于样本数)"""
+        n = len(self.samples)
+        if not n:
+            return None
+        rank = math.ceil(n * pct / 100.0)
+        seen = 0
+        for q in sorted(self._hist):
+            seen += self._hist[q]
+            if seen >= rank:
+                return q
+        return self.max()
+
+    def stat(self, name):
+        if name == 'p95':
+            return self.percentile(95)
+        return getattr(self, name)()
+
+
+class WindowAggregator:
+    """
+    多指标、多窗口聚合器
+    写入与读取可以来自不同线程 (如采集线程写、调度线程读)，统一用一把锁保护
+    """
+    STATS = ('avg', 'min', 'max', 'p95', 'last')
+
+    def __init__(self, spans=DEFAULT_SPANS):
+        self.spans = tuple(spans)
+        self._lock = threading.Lock()
+        self._metrics = {}  # key -> {span: SlidingWindow}
+
+    def add(self, key, ts, value):
+        if value is None:
+            return
+        with self._lock:
+            windows = self._metrics.get(key)
+            if windows is None:
+                windows = self._metrics[key] = {s: SlidingWindow(s) for s in self.spans}
+            for w in windows.values():
+                w.add(ts, value)
+
+    def remove(self, key):
+        """删除指标的全部窗口 (例如网卡已消失)"""
+        with self._lock:
+            self._metrics.pop(key, None)
+
+    def ensure_window(self, key, span):
+        """为指标追加一个自定义窗口 (例如告警规则引用了 10m)"""
+        with self._lock:
+            windows = self._metrics.setdefault(key, {s: SlidingWindow(s) for s in self.spans})
+            if span not in windows:
+                windows[span] = SlidingWindow(span)
+
+    def stat(self, key, span, name='avg', now=None):
+        """读取窗口统计；指标或窗口不存在、窗口内无数据时返回 None"""
+        with self._lock:
+            w = self._metrics.get(key, {}).get(span)
+            if w is None:
+                return None
+            if now is not None:
+                w.expire(now)
+            return w.stat(name)
+
+    def summary(self, key):
+        """{span: {avg, min, max, p95, count}}，供 API 展示"""
+        with self._lock:
+            out = {}
+            for span, w in self._metrics.get(key, {}).items():
+                out[span] = {s: w.stat(s) for s in ('avg', 'min', 'max', 'p95')}
+                out[span]['count'] = w.count
+            return out
+
+    def keys(self):
+        with self._lock:
+            return list(self._metrics)
+
+
+class WindowRule:
+    """
+    窗口告警规则
+    语法: "<指标> <avg|min|max|p95|last> [over] <N><s|m|h> <op> <阈值>"
+    例如: "cpu_temp avg over 5m > 75"
+    子类只需替换 PATTERN / parse / evaluate 中取值的部分，时间单位与比较运算共用
+    """
+    PATTERN = re.compile(
+        r'^\s*([\w.:/-]+)\s+(avg|min|max|p95|last)\s+(?:over\s+)?(\d+)\s*([smh])\s*(>=|<=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$'
+    )
+    LABEL = '告警规则'
+    UNITS = {'s': 1, 'm': 60, 'h': 3600}
+    OPS = {
+        '>': lambda a, b: a > b,
+        '>=': lambda a, b: a >= b,
+        '<': lambda a, b: a < b,
+        '<=': lambda a, b: a <= b,
+    }
+
+    def __init__(self, text, key, stat, span, op, threshold):
+        self.text = text
+        self.key = key
+        self.stat = stat
+        self.span = span
+        self.op = op
+        self.threshold = threshold
+
+    @classmethod
+    def _match(cls, text):
+        """按 PATTERN 匹配规则文本，返回分组；格式错误时抛出 ValueError"""
+        m = cls.PATTERN.match(text or '')
+        if not m:
+            raise ValueError(f"无法解析的{cls.LABEL}: {text}")
+        return m.groups()
+
+    @classmethod
+    def parse(cls, text):
+        """解析规则文本，格式错误时抛出 ValueError"""
+        key, stat, n, unit, op, threshold = cls._match(text)
+        return cls(text.strip(), key, stat, int(n) * cls.UNITS[unit], op, float(threshold))
+
+    def fires(self, value):
+        """当前值是否满足规则"""
+        return self.OPS[self.op](value, self.threshold)
+
+    def evaluate(self, aggregator, now=None):
+        """返回 (是否触发, 当前统计值)；窗口无数据时不触发"""
+        aggregator.ensure_window(self.key, self.span)
+        value = aggregator.stat(self.key, self.span, self.stat, now)
+        if value is None:
+            return False, None
+        return self.fires(value), round(value, 2)